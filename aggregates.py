@@ -0,0 +1,87 @@
+import pandas as pd
+from typing import Dict, List, Optional, Union
+from compact import month_key, month_periods
+import perf
+
+'''
+One rollup of the transactions shared by every tab, the chat coach and the forecasts.
+Rows are grouped once by month x category x account x transaction type; everything
+else (totals, spending by category, monthly series) is a slice of those cells, so a
+rerun never has to rescan the raw transactions for an aggregate.
+'''
+
+DIMENSIONS = ['YearMonth', 'Category', 'Account Name', 'Transaction Type']
+
+class AggregateCube:
+    """
+    Sum, count and mean of Amount per (month, category, account, transaction type).
+
+    where/exclude filters map a dimension to a value or a list of values, e.g.
+    where={'Transaction Type': 'debit'}, exclude={'Category': 'Credit Card Payment'}.
+    Months can be given as Periods or 'YYYY-MM' strings.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        # group on the integer month key and turn only the resulting cells into Periods
+        keys = {'YearMonth': df['MonthKey'] if 'MonthKey' in df.columns else month_key(df['Date'])}
+        for dim in DIMENSIONS[1:]:
+            keys[dim] = _sorted_categories(df[dim]) if dim in df.columns else pd.Series(None, index=df.index, dtype=object)
+        grouped = pd.DataFrame(keys, index=df.index).assign(Amount=df['Amount']).groupby(
+            DIMENSIONS, dropna=False, sort=True, observed=True)['Amount']
+        self.cells = grouped.agg(['sum', 'count']).reset_index()
+        self.cells['YearMonth'] = month_periods(self.cells['YearMonth'])
+
+    def months(self, where: Optional[Dict] = None) -> List[pd.Period]:
+        return sorted(self.slice(where)['YearMonth'].dropna().unique())
+
+    def slice(self, where: Optional[Dict] = None, exclude: Optional[Dict] = None) -> pd.DataFrame:
+        mask = pd.Series(True, index=self.cells.index)
+        for dim, value in (where or {}).items():
+            mask &= self._matches(dim, value)
+        for dim, value in (exclude or {}).items():
+            mask &= ~self._matches(dim, value)
+        return self.cells[mask]
+
+    def _matches(self, dim: str, value: Union[object, list]) -> pd.Series:
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        if dim == 'YearMonth':
+            values = [pd.Period(v, freq='M') for v in values]
+        return self.cells[dim].isin(values)
+
+    def rollup(self, by: Union[str, List[str]], where: Optional[Dict] = None,
+               exclude: Optional[Dict] = None, dropna: bool = True) -> pd.DataFrame:
+        """
+        sum, count and mean of the matching cells, grouped by one or more dimensions.
+        Like groupby, missing keys are left out unless dropna=False.
+        """
+        out = self.slice(where, exclude).groupby(by, dropna=dropna, sort=True, observed=True)[['sum', 'count']].sum()
+        out['mean'] = out['sum'] / out['count']
+        return out
+
+    def total(self, where: Optional[Dict] = None, exclude: Optional[Dict] = None) -> float:
+        return float(self.slice(where, exclude)['sum'].sum())
+
+    def monthly_series(self, where: Optional[Dict] = None, exclude: Optional[Dict] = None) -> pd.Series:
+        """Monthly totals with every month between the first and last filled in (0 when empty)."""
+        monthly = self.rollup('YearMonth', where, exclude)['sum']
+        if monthly.empty:
+            return monthly
+        full_range = pd.period_range(monthly.index.min(), monthly.index.max(), freq='M')
+        return monthly.reindex(full_range, fill_value=0)
+
+
+def _sorted_categories(values: pd.Series) -> pd.Series:
+    # categorical groups sort in category order; the store appends new categories at the
+    # end, so put them in value order to keep rollups sorted like plain text columns
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+    try:
+        return values.cat.reorder_categories(sorted(values.cat.categories))
+    except TypeError:
+        return values
+
+
+@perf.timed()
+def get_cube(store) -> AggregateCube:
+    """The cube for the store's current data, built at most once per store version."""
+    return store.cached('aggregate_cube', AggregateCube)
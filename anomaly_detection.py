@@ -1,28 +1,347 @@
+import atexit
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from typing import Optional
+import numpy as np
 import pandas as pd
+import perf
+
+@perf.timed()
+def anomaly(debits_df: pd.DataFrame, min_threshold: float = 50.0, absolute_threshold: float = 500.0, output: str = 'frame'):
+    """
+    Flag unusually large debits.
+
+    A row is an anomaly when its amount is above its category's Q3 + 1.5 * IQR and above
+    min_threshold (categories with more than 5 rows only), or above absolute_threshold.
+    Exact duplicate rows are reported once.
+
+    output='frame' returns the anomalous rows newest first, 'mask' a boolean Series
+    aligned with debits_df and 'index' the row labels, so callers can skip the copy.
+    """
+    if output not in ('frame', 'mask', 'index'):
+        raise ValueError(f"output must be 'frame', 'mask' or 'index', got {output!r}")
 
-def anomaly(debits_df: pd.DataFrame, min_threshold: float = 50.0, absolute_threshold: float = 500.0):
     if debits_df.empty or 'Category' not in debits_df.columns or 'Amount' not in debits_df.columns:
+        if output == 'mask':
+            return pd.Series(False, index=debits_df.index)
+        if output == 'index':
+            return debits_df.index[:0]
         return pd.DataFrame()
 
-    iqr_anomalies_list = []
-    
-    for category, group in debits_df.groupby('Category'):
-        if len(group) > 5:
-            Q1 = group['Amount'].quantile(0.25)
-            Q3 = group['Amount'].quantile(0.75)
-            IQR = Q3 - Q1
-            upper_bound = Q3 + (1.5 * IQR)
-            
-            category_anomalies = group[(group['Amount'] > upper_bound) & (group['Amount'] > min_threshold)]
-            iqr_anomalies_list.append(category_anomalies)
-
-    iqr_anomalies = pd.concat(iqr_anomalies_list) if iqr_anomalies_list else pd.DataFrame()
-
-    absolute_anomalies = debits_df[debits_df['Amount'] > absolute_threshold]
-
-    all_anomalies = pd.concat([iqr_anomalies, absolute_anomalies]).drop_duplicates().sort_values(by='Date', ascending=False)
-    
-    if all_anomalies.empty:
-        return pd.DataFrame()
-    
-    return all_anomalies
\ No newline at end of file
+    amounts = debits_df['Amount'].to_numpy(dtype=float, na_value=np.nan)
+
+    # per-category Q1, Q3 and row count in one grouped pass, broadcast back to the rows
+    codes, _ = pd.factorize(debits_df['Category'])
+    valid = codes >= 0
+    q1 = np.full(len(amounts), np.nan)
+    q3 = np.full(len(amounts), np.nan)
+    count = np.zeros(len(amounts), dtype=np.int64)
+    # without any category only the absolute_threshold rule applies
+    if valid.any():
+        grouped = pd.Series(amounts[valid]).groupby(codes[valid])
+        stats = grouped.quantile([0.25, 0.75]).unstack()
+        stats['count'] = grouped.size()
+        q1[valid] = stats[0.25].to_numpy()[codes[valid]]
+        q3[valid] = stats[0.75].to_numpy()[codes[valid]]
+        count[valid] = stats['count'].to_numpy()[codes[valid]]
+
+    upper_bound = q3 + 1.5 * (q3 - q1)
+    flags = ((count > 5) & (amounts > upper_bound) & (amounts > min_threshold)) | (amounts > absolute_threshold)
+
+    # identical rows always get the same decision, so only the flagged rows need de-duplicating
+    positions = np.flatnonzero(flags)
+    flagged = debits_df.iloc[positions]
+    duplicated = flagged.duplicated().to_numpy()
+    if duplicated.any():
+        flags[positions[duplicated]] = False
+        positions = positions[~duplicated]
+        flagged = flagged[~duplicated]
+
+    if output == 'mask':
+        return pd.Series(flags, index=debits_df.index)
+
+    if flagged.empty:
+        return debits_df.index[:0] if output == 'index' else pd.DataFrame()
+
+    flagged = flagged.sort_values(by='Date', ascending=False, kind='stable')
+    if output == 'index':
+        return flagged.index
+    return flagged
+
+
+class _LogHistogram:
+    """
+    Relative-error quantile sketch (the DDSketch idea): amounts are counted in buckets whose
+    edges grow by a factor of gamma, so any quantile comes back within alpha of the true value
+    and memory only depends on the range of amounts, never on how many were added.
+    """
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.counts = {}
+        self.keys = []
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, x: float):
+        self.count += 1
+        if x <= 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(x) / self.log_gamma)
+        if key in self.counts:
+            self.counts[key] += 1
+        else:
+            self.counts[key] = 1
+            bisect.insort(self.keys, key)
+
+    def _value_at(self, rank: int) -> float:
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in self.keys:
+            seen += self.counts[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** self.keys[-1] / (self.gamma + 1)
+
+    def quantile(self, p: float) -> float:
+        position = (self.count - 1) * p
+        lower = int(position)
+        low = self._value_at(lower)
+        if position == lower:
+            return low
+        return low + (self._value_at(lower + 1) - low) * (position - lower)
+
+    def to_dict(self) -> dict:
+        return {'alpha': self.alpha, 'zeros': self.zeros, 'counts': [[key, self.counts[key]] for key in self.keys]}
+
+    @classmethod
+    def from_dict(cls, state: dict):
+        histogram = cls(state['alpha'])
+        histogram.zeros = state['zeros']
+        histogram.counts = {key: count for key, count in state['counts']}
+        histogram.keys = sorted(histogram.counts)
+        histogram.count = histogram.zeros + sum(histogram.counts.values())
+        return histogram
+
+
+class _CategorySketch:
+    """Q1 and Q3 of one category: exact while small, then a _LogHistogram."""
+
+    def __init__(self, exact_size: int, alpha: float):
+        self.exact_size = exact_size
+        self.alpha = alpha
+        self.count = 0
+        self.values = []
+        self.histogram = None
+        self._quartiles = None
+
+    def add(self, amount: float):
+        self.count += 1
+        if amount != amount:
+            # NaN amounts count towards the category size but not its quantiles, like pandas
+            return
+        self._quartiles = None
+        if self.histogram is None:
+            bisect.insort(self.values, amount)
+            if len(self.values) > self.exact_size:
+                self.histogram = _LogHistogram(self.alpha)
+                for value in self.values:
+                    self.histogram.add(value)
+                self.values = []
+        else:
+            self.histogram.add(amount)
+
+    def quartiles(self):
+        if self._quartiles is None:
+            if self.histogram is not None:
+                self._quartiles = self.histogram.quantile(0.25), self.histogram.quantile(0.75)
+            elif self.values:
+                self._quartiles = _sorted_quantile(self.values, 0.25), _sorted_quantile(self.values, 0.75)
+        return self._quartiles
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'values': self.values,
+            'histogram': self.histogram.to_dict() if self.histogram is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict, exact_size: int, alpha: float):
+        sketch = cls(exact_size, alpha)
+        sketch.count = state['count']
+        sketch.values = list(state['values'])
+        if state['histogram'] is not None:
+            sketch.histogram = _LogHistogram.from_dict(state['histogram'])
+        return sketch
+
+
+def _sorted_quantile(values, p: float) -> float:
+    # linear interpolation, the same rule pandas uses for Series.quantile
+    position = (len(values) - 1) * p
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class StreamingAnomalyDetector:
+    """
+    Incremental version of anomaly() for scoring transactions as they are added.
+
+    Each category keeps a bounded sketch of its amounts: the exact values up to
+    exact_size of them, then a log-bucketed histogram whose size depends only on the
+    range of amounts. Updating is O(1) and scoring walks at most that fixed number of
+    buckets, independent of history length. to_dict()/from_dict() save and restore the
+    whole state as plain JSON-friendly data.
+
+    Tolerance: while a category has at most exact_size transactions its quartiles, and
+    therefore its decisions, are identical to anomaly(). Beyond that Q1 and Q3 are each
+    within alpha (relative) of the batch values, which keeps the Q3 + 1.5 * IQR fence
+    within 4 * alpha of the batch fence (2% with the default alpha of 0.005). Decisions
+    can only differ for amounts inside that band around the fence. The absolute_threshold
+    rule is always exact.
+    """
+
+    def __init__(self, min_threshold: float = 50.0, absolute_threshold: float = 500.0,
+                 exact_size: int = 256, alpha: float = 0.005):
+        self.min_threshold = min_threshold
+        self.absolute_threshold = absolute_threshold
+        self.exact_size = exact_size
+        self.alpha = alpha
+        self.sketches = {}
+        self.n_observed = 0
+
+    def update(self, category, amount: float):
+        self.n_observed += 1
+        if category is None or pd.isna(category):
+            return
+        sketch = self.sketches.get(category)
+        if sketch is None:
+            sketch = self.sketches[category] = _CategorySketch(self.exact_size, self.alpha)
+        sketch.add(float(amount))
+
+    def upper_bound(self, category):
+        """Q3 + 1.5 * IQR for the category, or None when anomaly() would skip it (5 rows or fewer)."""
+        sketch = self.sketches.get(category)
+        if sketch is None or sketch.count <= 5:
+            return None
+        quartiles = sketch.quartiles()
+        if quartiles is None:
+            return None
+        q1, q3 = quartiles
+        return q3 + 1.5 * (q3 - q1)
+
+    def score(self, category, amount: float) -> bool:
+        """Decide whether a transaction is anomalous against the current state, without adding it."""
+        amount = float(amount)
+        if amount > self.absolute_threshold:
+            return True
+        upper_bound = self.upper_bound(category)
+        return upper_bound is not None and amount > upper_bound and amount > self.min_threshold
+
+    def observe(self, category, amount: float) -> bool:
+        """Add a transaction and score it. Like anomaly(), the row counts towards its own category."""
+        self.update(category, amount)
+        return self.score(category, amount)
+
+    @perf.timed()
+    def fit(self, debits_df: pd.DataFrame):
+        if debits_df.empty or 'Category' not in debits_df.columns or 'Amount' not in debits_df.columns:
+            return self
+        for category, amount in zip(debits_df['Category'].tolist(), debits_df['Amount'].tolist()):
+            self.update(category, amount)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            'min_threshold': self.min_threshold,
+            'absolute_threshold': self.absolute_threshold,
+            'exact_size': self.exact_size,
+            'alpha': self.alpha,
+            'n_observed': self.n_observed,
+            'categories': {str(category): sketch.to_dict() for category, sketch in self.sketches.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict):
+        detector = cls(state['min_threshold'], state['absolute_threshold'], state['exact_size'], state['alpha'])
+        detector.n_observed = state['n_observed']
+        detector.sketches = {category: _CategorySketch.from_dict(sketch, detector.exact_size, detector.alpha)
+                             for category, sketch in state['categories'].items()}
+        return detector
+
+
+def debits_fingerprint(debits_df: pd.DataFrame, previous: int = 0) -> int:
+    """
+    Order-independent hash of the debits' categories and amounts, the only columns the
+    detector learns from. Row hashes are summed mod 2**64, so the fingerprint of a
+    history plus new rows is debits_fingerprint(new_rows, previous=fingerprint of the history).
+    """
+    if debits_df.empty:
+        return previous
+    hashes = pd.util.hash_pandas_object(debits_df[['Category', 'Amount']], index=False).to_numpy()
+    with np.errstate(over='ignore'):
+        return int(np.uint64(previous) + hashes.sum(dtype=np.uint64))
+
+
+class DetectorCheckpoint:
+    """
+    Saves a detector and the fingerprint of the debits it learned from to a JSON file,
+    at most once every interval seconds and once more when the process exits, so adding
+    transactions doesn't rewrite the state every time. A state that never got written
+    only means the next load finds a different fingerprint and refits.
+    """
+
+    def __init__(self, path: str, interval: float = 30.0):
+        self.path = path
+        self.interval = interval
+        self._pending = None
+        self._written = 0.0
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def load(self, fingerprint: int) -> Optional[StreamingAnomalyDetector]:
+        """A copy of the saved detector if it was saved for fingerprint, else None."""
+        with self._lock:
+            if self._pending is not None and self._pending[1] == fingerprint:
+                # saved but not written yet; copied so sessions don't share one detector
+                return StreamingAnomalyDetector.from_dict(self._pending[0].to_dict())
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('fingerprint') != fingerprint:
+            return None
+        return StreamingAnomalyDetector.from_dict(state['detector'])
+
+    def save(self, detector: StreamingAnomalyDetector, fingerprint: int, force: bool = False):
+        with self._lock:
+            self._pending = (detector, fingerprint)
+            if force or time.monotonic() - self._written >= self.interval:
+                self._write()
+
+    def flush(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        if self._pending is None:
+            return
+        detector, fingerprint = self._pending
+        tmp = self.path + '.tmp'
+        with open(tmp, "w") as f:
+            json.dump({'fingerprint': fingerprint, 'detector': detector.to_dict()}, f)
+        os.replace(tmp, self.path)
+        self._pending = None
+        self._written = time.monotonic()
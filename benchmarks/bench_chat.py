@@ -0,0 +1,105 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import chatbox
+from aggregates import AggregateCube
+from benchmarks.bench_prompt import load_sample, scale
+from llm_backends import HTTPBackend, set_backend, standin_server
+from response_cache import ResponseCache
+from transaction_store import TransactionStore
+
+'''
+End-to-end chat latency against the local LLM stand-in server.
+
+    python -m benchmarks.bench_chat --sessions 8 --messages 10 --latency 0.5 --jitter 0.15
+
+Each session is a thread that sends --messages chat questions through chatbox.response
+(or response_stream with --stream), so the timings include the prompt summary, the
+response cache and the HTTP round trip. The data is held in a TransactionStore as in
+the app, --scale repeats the sample history to make it longer. --repeat asks each
+question twice and reports the repeats (cache hits) separately; they should stay in
+the milliseconds however long the history. Reports p50/p95/p99 latency (time to first
+piece too when streaming) and throughput.
+'''
+
+
+def percentiles(values):
+    return np.percentile(values, [50, 95, 99]) if values else [float('nan')] * 3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default='dataset/personal_transactions.csv')
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--messages', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--jitter', type=float, default=0.15)
+    parser.add_argument('--token-delay', type=float, default=0.02)
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--repeat', action='store_true')
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+
+    store = TransactionStore(scale(load_sample(args.data), args.scale))
+    df = store.df
+    budget_df = pd.read_csv('dataset/Budget.csv')
+    budgets = dict(zip(budget_df['Category'], budget_df['Budget']))
+    cube = AggregateCube(df)
+
+    server = standin_server(port=0, latency=args.latency, jitter=args.jitter, token_delay=args.token_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    set_backend(HTTPBackend(f"http://127.0.0.1:{server.server_address[1]}"))
+    cache_dir = tempfile.mkdtemp()
+    chatbox.response_cache = ResponseCache(os.path.join(cache_dir, 'response_cache.json'))
+
+    latencies, first_piece, hits = [], [], []
+    lock = threading.Lock()
+
+    def session(i):
+        for j in range(args.messages):
+            question = f"Session {i}: how can I cut spending, question {j}?"
+            for attempt in range(2 if args.repeat else 1):
+                start = time.perf_counter()
+                if args.stream:
+                    first = None
+                    for _ in chatbox.response_stream(df, budgets, question, cube=cube, store=store):
+                        if first is None:
+                            first = time.perf_counter() - start
+                else:
+                    chatbox.response(df, budgets, question, cube=cube, store=store)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    (hits if attempt else latencies).append(elapsed)
+                    if args.stream:
+                        first_piece.append(first)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        list(pool.map(session, range(args.sessions)))
+    wall = time.perf_counter() - start
+    server.shutdown()
+
+    stats = chatbox.response_cache.stats()
+    print(f"{args.sessions} sessions x {args.messages} messages, latency {args.latency}s +/- {args.jitter}s"
+          f"{', streaming' if args.stream else ''}")
+    p50, p95, p99 = percentiles(latencies)
+    print(f"end to end:     p50 {p50 * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms")
+    if args.stream:
+        p50, p95, p99 = percentiles(first_piece)
+        print(f"first piece:    p50 {p50 * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms")
+    if hits:
+        p50, p95, p99 = percentiles(hits)
+        print(f"repeats:        p50 {p50 * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms")
+    print(f"throughput:     {(len(latencies) + len(hits)) / wall:7.1f} requests/s over {wall:.2f}s")
+    print(f"response cache: {stats['hits']} hits, {stats['misses']} misses")
+
+
+if __name__ == '__main__':
+    main()
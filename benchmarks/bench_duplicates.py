@@ -0,0 +1,51 @@
+import argparse
+import time
+
+from benchmarks.bench_prompt import load_sample, scale
+from duplicate_index import DuplicateIndex
+
+'''
+Cost of the duplicate-transaction checks as the history grows.
+
+    python -m benchmarks.bench_duplicates --scales 1 100 1000
+
+Builds the index over the scaled sample dataset, then times single-row exact and near
+checks, single-row adds and a 1,000-row batch check. The per-row times should stay flat
+as the row count grows.
+'''
+
+
+def per_call_ms(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default='dataset/personal_transactions.csv')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    base = load_sample(args.data)
+    row = base.iloc[0].to_dict()
+    batch = base.sample(1000, replace=True, random_state=0)
+
+    print(f"{'rows':>10} {'build s':>8} {'exact ms':>9} {'near ms':>8} {'add ms':>7} {'batch ms':>9}")
+    for factor in args.scales:
+        df = scale(base, factor)
+        start = time.perf_counter()
+        index = DuplicateIndex(df)
+        build = time.perf_counter() - start
+
+        exact = per_call_ms(lambda i: index.contains(row), args.repeat)
+        near = per_call_ms(lambda i: index.is_near_duplicate(row), args.repeat)
+        add = per_call_ms(lambda i: index.add({**row, 'Description': f"bench {i}"}), args.repeat)
+        checked = per_call_ms(lambda i: index.duplicates(batch) | index.near_duplicates(batch), 5)
+        print(f"{len(df):>10,} {build:>8.2f} {exact:>9.3f} {near:>8.3f} {add:>7.3f} {checked:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecasting import frcst, frcst_many
+
+'''
+frcst_many over many series against calling frcst once per series.
+
+    python -m benchmarks.bench_forecast --series 10000 --loop-sample 500
+
+Looping frcst over every series takes minutes, so by default only --loop-sample of them
+are timed and the loop is extrapolated; pass --loop-sample 0 to time them all.
+'''
+
+CATEGORIES = ['Groceries', 'Restaurants', 'Gas & Fuel', 'Shopping', 'Utilities', 'Mortgage & Rent']
+
+
+def make_transactions(n_series: int, n_months: int, per_month: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n = n_series * n_months * per_month
+    series = np.repeat(np.arange(n_series), n_months * per_month)
+    month = np.tile(np.repeat(np.arange(n_months), per_month), n_series)
+    base = rng.lognormal(4, 0.8, n_series)[series]
+    drift = rng.normal(0, 0.01, n_series)[series]
+    amounts = np.round(base * (1 + drift * month) * rng.lognormal(0, 0.3, n), 2)
+    dates = pd.Timestamp('2020-01-01') + pd.to_timedelta(month * 30 + rng.integers(0, 28, n), 'D')
+    return pd.DataFrame({
+        'Series': series,
+        'Date': dates,
+        'Amount': np.maximum(amounts, 0.01),
+        'Category': rng.choice(CATEGORIES, n),
+        'Transaction Type': 'debit',
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--series', type=int, default=10000)
+    parser.add_argument('--months', type=int, default=36)
+    parser.add_argument('--per-month', type=int, default=2)
+    parser.add_argument('--loop-sample', type=int, default=500)
+    args = parser.parse_args()
+
+    df = make_transactions(args.series, args.months, args.per_month)
+    print(f"{args.series} series, {len(df):,} transactions")
+
+    start = time.perf_counter()
+    long_df = df[['Series', 'Date', 'Amount']].rename(columns={'Date': 'YearMonth'})
+    fc = frcst_many(long_df, 3)
+    batched = time.perf_counter() - start
+
+    groups = dict(tuple(df.groupby('Series')))
+    sample = list(groups)[:args.loop_sample] if args.loop_sample else list(groups)
+    start = time.perf_counter()
+    for key in sample:
+        single = frcst(groups[key], 3)
+    looped = (time.perf_counter() - start) * len(groups) / len(sample)
+
+    # spot check the last looped series against the batched result
+    i = fc['series'].index(sample[-1])
+    assert np.allclose(single['total_forecast']['amounts'], fc['amounts'][i])
+    assert single['trend'] == fc['trend'][i]
+
+    label = 'looped frcst' if len(sample) == len(groups) else f'looped frcst (from {len(sample)})'
+    print(f"frcst_many:   {batched:8.3f}s")
+    print(f"{label}: {looped:8.3f}s ({looped / batched:,.0f}x slower)")
+
+
+if __name__ == '__main__':
+    main()
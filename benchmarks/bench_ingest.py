@@ -0,0 +1,73 @@
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_prompt import load_sample, scale
+
+'''
+Time and peak memory of importing a large bank export.
+
+    python -m benchmarks.bench_ingest --scale 2500
+
+Writes the sample dataset repeated scale times to a temporary CSV, then imports it in a
+fresh process both ways: a single read_csv with full-frame string and date passes, and
+the chunked streaming import into a TransactionStore.
+'''
+
+
+def full_read(path: str) -> int:
+    import pandas as pd
+    df = pd.read_csv(path)
+    for col in df.columns:
+        if pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].str.strip()
+    df['Date'] = pd.to_datetime(df['Date'], format="%m/%d/%Y")
+    return len(df)
+
+
+def streaming(path: str) -> int:
+    from csv_import import import_csv
+    from transaction_store import TransactionStore
+    store = TransactionStore()
+    report = import_csv(path, store)
+    assert report['error'] is None and report['error_count'] == 0
+    return len(store)
+
+
+def run(method: str, path: str):
+    start = time.perf_counter()
+    rows = {'full': full_read, 'streaming': streaming}[method](path)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    print(f"{method:>10} {rows:>11,} {elapsed:>7.2f} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default='dataset/personal_transactions.csv')
+    parser.add_argument('--scale', type=int, default=2500)
+    parser.add_argument('--run', nargs=2, metavar=('METHOD', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(*args.run)
+        return
+
+    df = scale(load_sample(args.data), args.scale)
+    df['Date'] = df['Date'].dt.strftime('%m/%d/%Y')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'export.csv')
+        df.to_csv(path, index=False)
+        del df
+        print(f"CSV {os.path.getsize(path) / 2**20:,.0f} MiB")
+        print(f"{'method':>10} {'rows':>11} {'seconds':>7} {'peak MiB':>9}")
+        for method in ('full', 'streaming'):
+            subprocess.run([sys.executable, '-m', 'benchmarks.bench_ingest', '--run', method, path], check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+import argparse
+
+from benchmarks.bench_prompt import load_sample, scale
+from compact import compact, memory_report, plain
+
+'''
+Bytes per transaction of the session DataFrame before and after compaction.
+
+    python -m benchmarks.bench_memory --scales 1 100 1000
+
+Prints the per-column breakdown at the largest scale and, for every scale, the total
+bytes per row and how many transactions fit in 1 GiB each way.
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default='dataset/personal_transactions.csv')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 100, 1000])
+    args = parser.parse_args()
+
+    base = load_sample(args.data)
+    print(f"{'rows':>10} {'before B/row':>12} {'after B/row':>11} {'ratio':>6} {'rows/GiB after':>15}")
+    for factor in args.scales:
+        df = plain(scale(base, factor))
+        report = memory_report(df, compact(df))
+        before, after = report.loc['total', 'Before'], report.loc['total', 'After']
+        print(f"{len(df):>10,} {before:>12.1f} {after:>11.1f} {before / after:>5.1f}x {2**30 / after:>15,.0f}")
+    print()
+    print(report.round(1).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from prompt_builder import build_summary, estimate_tokens, get_summary, DEFAULT_TOKEN_BUDGET
+from transaction_store import TransactionStore
+
+'''
+Size of the coach's summary prompt as the history grows.
+
+    python -m benchmarks.bench_prompt --scales 1 10 100
+
+The sample dataset is repeated (amounts jittered) to scale the row count; the summary
+must stay within the token budget and about the same size at every scale. Besides the
+cold build, it times the summary a repeated chat message gets from get_summary() over
+an unchanged TransactionStore, which must not grow with the history.
+'''
+
+
+def load_sample(path: str) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    for col in df.columns:
+        if df[col].dtype == 'object' or pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].str.strip()
+    df['Date'] = pd.to_datetime(df['Date'], format="%m/%d/%Y")
+    return df
+
+
+def scale(df: pd.DataFrame, factor: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    out = pd.concat([df] * factor, ignore_index=True)
+    out['Amount'] = np.round(out['Amount'] * rng.lognormal(0, 0.1, len(out)), 2)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default='dataset/personal_transactions.csv')
+    parser.add_argument('--budgets', default='dataset/Budget.csv')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--token-budget', type=int, default=DEFAULT_TOKEN_BUDGET)
+    parser.add_argument('--messages', type=int, default=20, help="repeated messages timed per scale")
+    args = parser.parse_args()
+
+    base = load_sample(args.data)
+    budget_df = pd.read_csv(args.budgets)
+    budgets = dict(zip(budget_df['Category'], budget_df['Budget']))
+
+    print(f"{'rows':>10} {'chars':>7} {'tokens':>7} {'build s':>8} {'repeat ms':>9}")
+    sizes = []
+    for factor in args.scales:
+        df = scale(base, factor)
+        start = time.perf_counter()
+        summary = build_summary(df, budgets, token_budget=args.token_budget)
+        elapsed = time.perf_counter() - start
+
+        store = TransactionStore(df)
+        get_summary(store, budgets, args.token_budget)
+        start = time.perf_counter()
+        for _ in range(args.messages):
+            repeated = get_summary(store, budgets, args.token_budget)
+        per_message = (time.perf_counter() - start) / args.messages
+        assert repeated == build_summary(store.df, budgets, token_budget=args.token_budget)
+
+        tokens = estimate_tokens(summary)
+        sizes.append(tokens)
+        print(f"{len(df):>10,} {len(summary):>7,} {tokens:>7,} {elapsed:>8.3f} {per_message * 1000:>9.3f}")
+        assert tokens <= args.token_budget, f"summary is {tokens} tokens, budget {args.token_budget}"
+
+    growth = max(sizes) / min(sizes)
+    print(f"rows grew {max(args.scales) // min(args.scales)}x, prompt size changed {growth:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
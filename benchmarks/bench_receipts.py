@@ -0,0 +1,46 @@
+import argparse
+import time
+
+from nlp import parse_receipt_rules
+from benchmarks import receipt_rules_baseline
+from benchmarks.receipt_corpus import generate_receipts
+
+'''
+Receipts per second for nlp.parse_receipt_rules against the original per-field extractors.
+
+    python -m benchmarks.bench_receipts --receipts 20000
+'''
+
+
+def _throughput(fn, corpus, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--receipts', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = generate_receipts(args.receipts, seed=args.seed)
+
+    mismatches = [text for text in corpus if parse_receipt_rules(text) != receipt_rules_baseline.rule_based_extraction(text)]
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} receipts differ between the two parsers, first:\n{mismatches[0]}")
+
+    old = _throughput(receipt_rules_baseline.rule_based_extraction, corpus, args.repeat)
+    new = _throughput(parse_receipt_rules, corpus, args.repeat)
+    print(f"receipts:            {len(corpus)} (all results identical)")
+    print(f"original functions:  {old:,.0f} receipts/s")
+    print(f"single-pass engine:  {new:,.0f} receipts/s ({new / old:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.bench_suite import RESULTS_DIR, _commit
+
+'''
+Cold import cost of the app, the part of time-to-first-render the code controls.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --baseline benchmarks/results/startup-abc1234.json
+
+Each run is a fresh interpreter doing `import main` under `python -X importtime`, from an
+empty working directory so no saved state is read. The best of --runs is kept, with the
+modules main pulled in directly and their cumulative import times. The command exits 1
+when a deferred dependency (--deferred, by default the NER, OCR, Gemini and Plotly
+Express stacks) is imported at startup, or with --baseline when the import got slower
+than --threshold.
+'''
+
+# import times wander by tens of milliseconds between runs
+MIN_DELTA = 0.05
+DEFERRED = ['transformers', 'torch', 'pytesseract', 'PIL.Image', 'google.genai', 'plotly.express']
+
+
+def parse_importtime(stderr: str):
+    """(module, depth, self us, cumulative us) for every line -X importtime printed."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def import_main(repo: str, cwd: str):
+    env = dict(os.environ, PYTHONPATH=repo)
+    env.pop('NER_WARMUP', None)
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                         cwd=cwd, env=env, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    return seconds, parse_importtime(out.stderr)
+
+
+def measure(repo: str, runs: int):
+    with tempfile.TemporaryDirectory() as cwd:
+        # the first run compiles bytecode and warms the file cache
+        import_main(repo, cwd)
+        best = None
+        for _ in range(runs):
+            seconds, modules = import_main(repo, cwd)
+            if best is None or seconds < best[0]:
+                best = (seconds, modules)
+    seconds, modules = best
+    main_us = next(cumulative for name, depth, _, cumulative in modules if name == 'main' and depth == 0)
+    # main's direct imports are the modules one level below it
+    children = sorted(((name, cumulative) for name, depth, _, cumulative in modules if depth == 1),
+                      key=lambda m: m[1], reverse=True)
+    return {
+        'process_seconds': seconds,
+        'import_seconds': main_us / 1e6,
+        'modules': len(modules),
+        'top': [{'module': name, 'seconds': us / 1e6} for name, us in children],
+        'imported': sorted({name for name, *_ in modules}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--deferred', nargs='*', default=DEFERRED, help="modules that must not load at startup")
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None, help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args()
+
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = measure(repo, args.runs)
+    print(f"import main: {result['import_seconds']:.3f}s, process {result['process_seconds']:.3f}s, {result['modules']} modules")
+    for module in result['top'][:10]:
+        print(f"{module['module']:>30} {module['seconds']:>8.3f}s")
+
+    meta = {
+        'commit': _commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'runs': args.runs,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"startup-{meta['commit']}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'meta': meta, 'result': result}, f, indent=1)
+    print(f"results written to {output}")
+
+    failed = False
+    loaded = [m for m in args.deferred if m in result['imported']]
+    if loaded:
+        print(f"imported at startup but should be deferred: {', '.join(loaded)}")
+        failed = True
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            before = json.load(f)
+        old, new = before['result']['import_seconds'], result['import_seconds']
+        slower = new / max(old, 1e-9) > args.threshold and new - old > MIN_DELTA
+        print(f"against {before['meta']['commit']}: {new / max(old, 1e-9):.2f}x{' SLOWER' if slower else ''}")
+        failed |= slower
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
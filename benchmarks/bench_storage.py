@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import columnar_store
+from csv_import import import_csv
+from transaction_store import TransactionStore
+
+'''
+Cold-start load time and memory: the CSV path against the columnar store.
+
+    python -m benchmarks.bench_storage --rows 1000000
+
+Each load runs in a fresh interpreter so nothing is cached between them. Memory is the
+growth in resident set size (Linux /proc) caused by the load, after pandas and pyarrow
+are imported, plus the frame's own deep memory_usage.
+
+Before timing anything it checks that a history imported from the CSV, with a row added
+the way the app's forms add one, still loads back as a single frame.
+'''
+
+CSV_LOAD = '''
+df = pd.read_csv(path)
+for col in df.columns:
+    if df[col].dtype == 'object' or str(df[col].dtype) == 'str':
+        df[col] = df[col].str.strip()
+df['Date'] = pd.to_datetime(df['Date'], format="%m/%d/%Y")
+'''
+
+COLUMNAR_LOAD = '''
+df = columnar_store.load_transactions(path)
+'''
+
+CHILD = '''
+import json, sys, time
+import pandas as pd
+import columnar_store
+def rss_mb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS')) / 1024
+path = sys.argv[1]
+before = rss_mb()
+start = time.perf_counter()
+{load}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss_mb() - before, "frame_mb": df.memory_usage(deep=True).sum() / 1e6}}))
+'''
+
+
+def make_dataset(rows: int, seed: int = 0) -> pd.DataFrame:
+    sample = pd.read_csv('dataset/personal_transactions.csv')
+    rng = np.random.default_rng(seed)
+    df = sample.iloc[rng.integers(0, len(sample), rows)].reset_index(drop=True)
+    dates = pd.Timestamp('2010-01-01') + pd.to_timedelta(rng.integers(0, 15 * 365, rows), 'D')
+    df['Date'] = dates.strftime('%m/%d/%Y')
+    df['Amount'] = np.round(df['Amount'].to_numpy() * rng.uniform(0.5, 1.5, rows), 2)
+    return df
+
+
+def check_round_trip(csv_path: str, store_path: str):
+    """Save a CSV import, append a one-row frame (as the forms do) and load both back."""
+    store = TransactionStore()
+    report = import_csv(csv_path, store)
+    assert report['error'] is None and report['error_count'] == 0
+    columnar_store.save_transactions(store.df, store_path)
+    row = pd.DataFrame([{'Date': pd.Timestamp('2024-01-02'), 'Description': 'Coffee', 'Amount': 4.5,
+                         'Transaction Type': 'debit', 'Category': 'Coffee Shops', 'Account Name': 'Checking'}])
+    columnar_store.append_transactions(row, store_path)
+    loaded = columnar_store.load_transactions(store_path)
+    assert len(loaded) == len(store) + 1
+    assert loaded['Description'].iloc[-1] == 'Coffee'
+
+
+def run(load: str, path: str) -> dict:
+    code = CHILD.format(load=load)
+    out = subprocess.run([sys.executable, '-c', code, path], capture_output=True, text=True, check=True,
+                         cwd=os.getcwd(), env={**os.environ, 'PYTHONPATH': os.getcwd()})
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        check_round_trip('dataset/personal_transactions.csv', os.path.join(tmp, 'round_trip'))
+        csv_path = os.path.join(tmp, 'transactions.csv')
+        store_path = os.path.join(tmp, 'transactions')
+        df = make_dataset(args.rows)
+        df.to_csv(csv_path, index=False)
+        parsed = df.assign(Date=pd.to_datetime(df['Date'], format="%m/%d/%Y"))
+        columnar_store.save_transactions(parsed, store_path)
+
+        print(f"{args.rows:,} rows, CSV {os.path.getsize(csv_path) / 1e6:.1f} MB, "
+              f"columnar {sum(os.path.getsize(os.path.join(store_path, f)) for f in os.listdir(store_path)) / 1e6:.1f} MB")
+        for name, load, path in (('csv', CSV_LOAD, csv_path), ('columnar', COLUMNAR_LOAD, store_path)):
+            results = [run(load, path) for _ in range(args.repeat)]
+            best = min(results, key=lambda r: r['seconds'])
+            print(f"{name:>9}: {best['seconds']:.3f}s load, +{best['rss_mb']:.0f} MB RSS, frame {best['frame_mb']:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
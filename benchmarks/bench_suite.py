@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from anomaly_detection import anomaly
+from benchmarks import anomaly_baseline
+from benchmarks.receipt_corpus import generate_receipts
+from benchmarks.synthetic import generate, load_profile
+from compact import compact
+from forecasting import frcst, frcstby_cat, get_budget_runway
+from nlp import parse_receipt_rules
+
+'''
+Time and peak memory of the analytics functions across history sizes.
+
+    python -m benchmarks.bench_suite --sizes 1000 10000 100000 1000000
+    python -m benchmarks.bench_suite --baseline benchmarks/results/suite-abc1234.json
+
+Every size gets a seeded synthetic history (benchmarks.synthetic) in the app's compact
+schema. Each function is timed best-of-N with tracing off, then run once more under
+tracemalloc for its peak allocation (numpy and pandas buffers included). Results are
+written as JSON, by default benchmarks/results/suite-<commit>.json; with --baseline the
+run is compared against an earlier file and the command exits 1 if anything got slower
+than --threshold.
+
+The receipt rules are timed on one synthetic receipt per transaction, up to
+--max-receipts. Before anything is timed, anomaly() is checked against the original
+per-category loop (benchmarks.anomaly_baseline) on edge cases such as debits without
+any category, and on every history up to CHECK_ROWS rows.
+'''
+
+RESULTS_DIR = os.path.join('benchmarks', 'results')
+# differences smaller than this are timer noise, whatever the ratio
+MIN_DELTA = 0.002
+# the baseline anomaly() loop is slow, so larger histories are only timed
+CHECK_ROWS = 100_000
+
+
+def _debits(df):
+    return df[df['Transaction Type'] == 'debit']
+
+
+def cases(df: pd.DataFrame, receipts):
+    """(name, items, fn) for every benchmarked call on df."""
+    budgets = {c: 500.0 for c in df['Category'].cat.categories}
+    debits = _debits(df)
+    return [
+        ('anomaly', len(debits), lambda: anomaly(debits)),
+        ('frcst', len(df), lambda: frcst(df, 3, 'debit')),
+        ('frcstby_cat', len(debits), lambda: frcstby_cat(debits, 3)),
+        ('get_budget_runway', len(df), lambda: get_budget_runway(df, budgets, 10_000.0)),
+        ('runway_simulation', len(df), lambda: get_budget_runway(df, budgets, 10_000.0, simulate=True, seed=0)),
+        ('parse_receipt_rules', len(receipts), lambda: [parse_receipt_rules(text) for text in receipts]),
+    ]
+
+
+def _rows(df: pd.DataFrame) -> pd.DataFrame:
+    # the same rows in a fixed order, whatever order and index they came in
+    if df.empty:
+        return df
+    return df.astype(object).sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def anomaly_edge_cases(df: pd.DataFrame):
+    """Debit frames that have broken anomaly() before: no category at all, only tiny categories."""
+    debits = _debits(df).head(200).copy()
+    return {
+        'no_category': debits.assign(Category=None),
+        'some_categories_missing': debits.assign(Category=debits['Category'].where(np.arange(len(debits)) % 2 == 0)),
+        'tiny': debits.head(5),
+        'empty': debits.head(0),
+    }
+
+
+def check_anomaly(frames):
+    for name, debits in frames.items():
+        new, old = anomaly(debits), anomaly_baseline.anomaly(debits)
+        if len(new) != len(old) or not _rows(new).equals(_rows(old)):
+            raise SystemExit(f"anomaly() differs from the baseline on {name}: {len(new)} rows against {len(old)}")
+
+
+def measure(fn, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return best, peak
+
+
+def _commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip()
+        return out.stdout.strip() + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(sizes, seed: int, max_receipts: int, min_seconds: float):
+    groups = load_profile()
+    results = []
+    for n in sizes:
+        start = time.perf_counter()
+        df = compact(generate(n, seed, groups=groups))
+        receipts = generate_receipts(min(n, max_receipts), seed)
+        print(f"{n:,} rows generated in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        frames = anomaly_edge_cases(df)
+        if n <= CHECK_ROWS:
+            frames['history'] = _debits(df)
+        check_anomaly(frames)
+
+        for name, items, fn in cases(df, receipts):
+            # one untimed call warms caches and tells how many repeats fit the time budget
+            start = time.perf_counter()
+            fn()
+            first = time.perf_counter() - start
+            repeat = int(np.clip(min_seconds / max(first, 1e-9), 1, 5))
+            seconds, peak = measure(fn, repeat)
+            results.append({
+                'function': name, 'rows': n, 'items': items, 'seconds': seconds,
+                'per_item_us': seconds / max(items, 1) * 1e6, 'peak_bytes': peak, 'repeat': repeat,
+            })
+            print(f"{name:>20} {n:>11,} {seconds:>10.4f}s {peak / 2**20:>10.1f} MiB", file=sys.stderr)
+        del df, receipts
+    return results
+
+
+def compare(results, baseline, threshold: float) -> bool:
+    """Print new/old time ratios; True when something is slower than threshold."""
+    old = {(r['function'], r['rows']): r for r in baseline['results']}
+    regressed = False
+    print(f"\nagainst {baseline['meta']['commit']}:")
+    print(f"{'function':>20} {'rows':>11} {'time':>7} {'memory':>7}")
+    for r in results:
+        before = old.get((r['function'], r['rows']))
+        if before is None:
+            continue
+        ratio = r['seconds'] / max(before['seconds'], 1e-9)
+        memory = r['peak_bytes'] / max(before['peak_bytes'], 1)
+        slower = ratio > threshold and r['seconds'] - before['seconds'] > MIN_DELTA
+        flag = ' SLOWER' if slower else ''
+        regressed |= slower
+        print(f"{r['function']:>20} {r['rows']:>11,} {ratio:>6.2f}x {memory:>6.2f}x{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-receipts', type=int, default=20_000)
+    parser.add_argument('--min-seconds', type=float, default=1.0, help="time budget per case for repeats")
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None, help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args()
+
+    meta = {
+        'commit': _commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'sizes': args.sizes,
+    }
+    results = run(args.sizes, args.seed, args.max_receipts, args.min_seconds)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"suite-{meta['commit']}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=1)
+    print(f"results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
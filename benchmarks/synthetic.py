@@ -0,0 +1,118 @@
+import argparse
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+'''
+Seeded synthetic transaction histories at any size, with the sample dataset's mix.
+
+    python -m benchmarks.synthetic --rows 1000000 --out /tmp/transactions.csv
+
+The sample (dataset/personal_transactions.csv) is profiled once: how often each
+(transaction type, category) occurs, which description and account pairs it uses, and
+the log-normal spread of its amounts. Rows are then drawn from that profile over a date
+range that grows with the row count (a year at 10^3 rows, ten at 10^6 and above), so
+monthly series keep a realistic length. The same seed always gives the same rows.
+
+Text columns come back as categoricals, the app's in-memory schema, so 10^7 rows fit in
+a few hundred MB; pass them through compact() for MonthKey.
+'''
+
+SAMPLE_PATH = 'dataset/personal_transactions.csv'
+# the smallest spread given to a category seen with a single amount
+MIN_SIGMA = 0.05
+
+
+def profile(sample: pd.DataFrame) -> Dict:
+    """Per (type, category): share of rows, (description, account) pairs with weights, log-amount mean and sd."""
+    groups = {}
+    total = len(sample)
+    for (kind, category), rows in sample.groupby(['Transaction Type', 'Category'], sort=True, observed=True):
+        pairs = rows.groupby(['Description', 'Account Name'], sort=True, observed=True).size()
+        logs = np.log(rows['Amount'].clip(lower=0.01))
+        groups[(kind, category)] = {
+            'share': len(rows) / total,
+            'pairs': list(pairs.index),
+            'pair_weights': (pairs / pairs.sum()).to_numpy(),
+            'mu': float(logs.mean()),
+            'sigma': max(MIN_SIGMA, float(logs.std(ddof=0))),
+        }
+    return groups
+
+
+def load_profile(path: str = SAMPLE_PATH) -> Dict:
+    sample = pd.read_csv(path)
+    sample.columns = [col.strip() for col in sample.columns]
+    return profile(sample)
+
+
+def default_months(n_rows: int) -> int:
+    return int(np.clip(n_rows // 1000, 12, 120))
+
+
+def generate(n_rows: int, seed: int = 0, months: Optional[int] = None, start: str = '2015-01-01',
+             groups: Optional[Dict] = None) -> pd.DataFrame:
+    """n_rows transactions sorted by date, in the sample's columns."""
+    groups = groups or load_profile()
+    months = months or default_months(n_rows)
+    rng = np.random.default_rng(seed)
+
+    keys = list(groups)
+    shares = np.array([groups[k]['share'] for k in keys])
+    group = rng.choice(len(keys), size=n_rows, p=shares / shares.sum())
+
+    descriptions = sorted({d for k in keys for d, _ in groups[k]['pairs']})
+    accounts = sorted({a for k in keys for _, a in groups[k]['pairs']})
+    categories = sorted({c for _, c in keys})
+    kinds = sorted({t for t, _ in keys})
+    description_code = {d: i for i, d in enumerate(descriptions)}
+    account_code = {a: i for i, a in enumerate(accounts)}
+
+    desc = np.empty(n_rows, dtype=np.int32)
+    account = np.empty(n_rows, dtype=np.int32)
+    amount = np.empty(n_rows, dtype=np.float64)
+    for g, key in enumerate(keys):
+        rows = np.flatnonzero(group == g)
+        if len(rows) == 0:
+            continue
+        spec = groups[key]
+        pair = rng.choice(len(spec['pairs']), size=len(rows), p=spec['pair_weights'])
+        desc[rows] = np.array([description_code[d] for d, _ in spec['pairs']])[pair]
+        account[rows] = np.array([account_code[a] for _, a in spec['pairs']])[pair]
+        amount[rows] = rng.lognormal(spec['mu'], spec['sigma'], len(rows))
+
+    first = pd.Timestamp(start)
+    days = (first + pd.DateOffset(months=months) - first).days
+    # every other column is drawn independently of the row, so sorting the days is enough
+    day = np.sort(rng.integers(0, days, n_rows))
+
+    category_code = np.array([categories.index(c) for _, c in keys])
+    kind_code = np.array([kinds.index(t) for t, _ in keys])
+    return pd.DataFrame({
+        'Date': first.to_datetime64() + day.astype('timedelta64[D]'),
+        'Description': pd.Categorical.from_codes(desc, descriptions),
+        'Amount': np.maximum(np.round(amount, 2), 0.01),
+        'Transaction Type': pd.Categorical.from_codes(kind_code[group], kinds),
+        'Category': pd.Categorical.from_codes(category_code[group], categories),
+        'Account Name': pd.Categorical.from_codes(account, accounts),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic transaction history as CSV.")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--months', type=int, default=None)
+    parser.add_argument('--sample', default=SAMPLE_PATH)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+
+    df = generate(args.rows, args.seed, args.months, groups=load_profile(args.sample))
+    df['Date'] = df['Date'].dt.strftime('%m/%d/%Y')
+    df.to_csv(args.out, index=False)
+    print(f"wrote {len(df):,} rows to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
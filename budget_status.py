@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+from aggregates import AggregateCube, get_cube
+import perf
+
+'''
+Budget status for any month, or any run of months, as array lookups.
+Debit spending is laid out once per store version as a dense month x category matrix
+(every month between the first and last debit, zeros where nothing was spent) and
+turned into prefix sums along the months, so the spend of each category over months
+i..j is one row difference, P[j + 1] - P[i]. Budgets are monthly amounts joined as a
+vector over the categories and scaled by the number of months in the view.
+'''
+
+VIEWS = {'month': 'Month', 'qtd': 'Quarter to date', 'ytd': 'Year to date'}
+# share of the budget after which a category is flagged
+WARNING_USAGE = 0.9
+
+class BudgetMatrix:
+    """Monthly debit spend per category, with prefix sums for month ranges."""
+
+    def __init__(self, cube: AggregateCube):
+        spend = cube.rollup(['YearMonth', 'Category'], where={'Transaction Type': 'debit'})['sum']
+        self.categories = list(spend.index.get_level_values('Category').unique())
+        self._column = {category: i for i, category in enumerate(self.categories)}
+        if spend.empty:
+            self.first = self.last = None
+            self.prefix = np.zeros((1, len(self.categories)))
+            return
+
+        months = spend.index.get_level_values('YearMonth')
+        ordinals = months.asi8
+        self.first, self.last = int(ordinals.min()), int(ordinals.max())
+        matrix = np.zeros((self.last - self.first + 1, len(self.categories)))
+        rows = ordinals - self.first
+        cols = np.array([self._column[c] for c in spend.index.get_level_values('Category')])
+        matrix[rows, cols] = spend.to_numpy()
+        self.prefix = np.vstack([np.zeros((1, len(self.categories))), np.cumsum(matrix, axis=0)])
+
+    def window(self, month=None, view: str = 'month') -> Tuple[int, int]:
+        """First and last month ordinals of the view ending at month (every month when month is None)."""
+        if month is None:
+            return (self.first, self.last) if self.first is not None else (0, 0)
+        end = pd.Period(month, freq='M')
+        if view == 'month':
+            start = end
+        elif view == 'qtd':
+            start = end.asfreq('Q').asfreq('M', how='start')
+        elif view == 'ytd':
+            start = pd.Period(year=end.year, month=1, freq='M')
+        else:
+            raise ValueError(f"Unknown budget view: {view}")
+        return start.ordinal, end.ordinal
+
+    def spent(self, start: int, end: int) -> np.ndarray:
+        """Spend per category (in self.categories order) over months start..end, both included."""
+        if self.first is None:
+            return np.zeros(len(self.categories))
+        n = len(self.prefix) - 1
+        i = min(max(start - self.first, 0), n)
+        j = min(max(end - self.first + 1, 0), n)
+        return self.prefix[j] - self.prefix[min(i, j)]
+
+    def status(self, budgets: Dict, month=None, view: str = 'month') -> pd.DataFrame:
+        """
+        Budget, Spent, Remaining, Usage (spent / budget) and Status ('over', 'warning' or
+        'on track') for every budgeted category, in the order of budgets. Budget is the
+        monthly budget times the months in the view.
+        """
+        start, end = self.window(month, view)
+        names = list(budgets)
+        budget = np.array([budgets[c] for c in names], dtype=float) * max(1, end - start + 1)
+        # categories never spent in read the extra zero at the end
+        by_category = np.append(self.spent(start, end), 0.0)
+        spent = by_category[np.array([self._column.get(c, -1) for c in names], dtype=int)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            usage = spent / budget
+        status = np.where(spent > budget, 'over', np.where(spent > budget * WARNING_USAGE, 'warning', 'on track'))
+        return pd.DataFrame({'Category': names, 'Budget': budget, 'Spent': spent,
+                             'Remaining': budget - spent, 'Usage': usage, 'Status': status})
+
+
+@perf.timed()
+def get_budget_matrix(store) -> BudgetMatrix:
+    """The matrix for the store's current data, built at most once per store version."""
+    return store.cached('budget_matrix', lambda df: BudgetMatrix(get_cube(store)))
@@ -1,60 +1,106 @@
-import streamlit as st
-import os
+import threading
 import pandas as pd
-from google import genai
-from dotenv import load_dotenv
-
-def response(financial_data: pd.DataFrame, budgets: dict, message: str):
-    try:
-        load_dotenv()
-        api = os.getenv("GEMINI_API_KEY")
-        client = genai.Client(api_key=api)
-    except AttributeError:
-        st.error("API Key not found")
-    
-    debits_df = financial_data[financial_data['Transaction Type'] == 'debit']
-    credits_df = financial_data[financial_data['Transaction Type'] == 'credit']
-
-    total_income = credits_df['Amount'].sum()
-    total_expense = debits_df['Amount'].sum()
-    net_savings = total_income - total_expense
-    category_spending = debits_df.groupby('Category')['Amount'].sum().to_dict()
-
-    summary_data = f"""
-    - Total Income: ${total_income:,.2f}
-    - Total Expenses: ${total_expense:,.2f}
-    - Net Savings: ${net_savings:,.2f}
-    - Spending by Category: {category_spending}
-    - Budgets by Category: {budgets}
-    """
-    
+from concurrent.futures import Future, ThreadPoolExecutor
+import perf
+from aggregates import AggregateCube
+from llm_backends import get_backend
+from prompt_builder import build_summary, get_summary
+from response_cache import ResponseCache, data_fingerprint, get_fingerprint
+
+MODEL = "gemini-2.5-flash"
+# the same question over unchanged data is answered from disk instead of another round trip
+response_cache = ResponseCache("response_cache.json")
+
+def _generate(key: str, build_prompt):
+    # the prompt is only built on a miss; a hit needs nothing but the key
+    cached = response_cache.get(key)
+    if cached is not None:
+        perf.count('llm.cache_hits')
+        return cached
+
+    # one backend per process (see llm_backends), so calls reuse its connections
+    with perf.span('llm.generate'):
+        text = get_backend().generate(MODEL, build_prompt())
+    if text:
+        response_cache.put(key, text)
+    return text
+
+def _generate_stream(key: str, build_prompt):
+    cached = response_cache.get(key)
+    if cached is not None:
+        perf.count('llm.cache_hits')
+        yield cached
+        return
+
+    parts = []
+    # includes the time the caller spends rendering each piece
+    with perf.span('llm.stream'):
+        for chunk in get_backend().stream(MODEL, build_prompt()):
+            parts.append(chunk)
+            yield chunk
+    text = ''.join(parts)
+    if text:
+        response_cache.put(key, text)
+
+def _cache_key(request: str, financial_data: pd.DataFrame, budgets: dict, store=None) -> str:
+    # the summary in a prompt is derived from the data and budgets the fingerprint covers,
+    # so the request (which prompt, and the question) and the fingerprint identify the answer
+    fingerprint = get_fingerprint(store, budgets) if store is not None else data_fingerprint(financial_data, budgets)
+    return response_cache.key(MODEL, request, fingerprint)
+
+def _response_prompt(financial_data: pd.DataFrame, budgets: dict, message: str, cube: AggregateCube = None, store=None):
+    # a bounded summary instead of the raw rows, the same one analysis() sends, built
+    # once per store version when the store is known
+    summary_data = get_summary(store, budgets) if store is not None else build_summary(financial_data, budgets, cube)
+
     prompt = f"You are an expert financial coach. Analyze the following financial data and answer the user's question.\n\nFinancial Data:\n{summary_data}\n\nUser's Question:\n{message}"
     
-    ai_response = client.models.generate_content(model= "gemini-2.5-flash", contents= prompt)
-    return ai_response.text
+    return prompt
 
-def analysis(financial_data: pd.DataFrame):
-    try:
-        load_dotenv()
-        api = os.getenv("GEMINI_API_KEY")
-        client = genai.Client(api_key=api)
-    except AttributeError:
-        st.error("API Key not found")
+def response(financial_data: pd.DataFrame, budgets: dict, message: str, cube: AggregateCube = None, store=None):
+    """
+    Answer message about the data. Pass the TransactionStore financial_data comes from as
+    store to hash and summarize the data once per store version instead of on every message.
+    """
+    key = _cache_key(f"response: {message}", financial_data, budgets, store)
+    return _generate(key, lambda: _response_prompt(financial_data, budgets, message, cube, store))
 
-    debits_df = financial_data[financial_data['Transaction Type'] == 'debit']
-    credits_df = financial_data[financial_data['Transaction Type'] == 'credit']
+def response_stream(financial_data: pd.DataFrame, budgets: dict, message: str, cube: AggregateCube = None, store=None):
+    """Same answer as response(), yielded piece by piece as it arrives (for st.write_stream)."""
+    key = _cache_key(f"response: {message}", financial_data, budgets, store)
+    return _generate_stream(key, lambda: _response_prompt(financial_data, budgets, message, cube, store))
 
-    total_income = credits_df['Amount'].sum()
-    total_expense = debits_df['Amount'].sum()
-    net_savings = total_income - total_expense
+def _analysis_prompt(financial_data: pd.DataFrame, budgets: dict = None, cube: AggregateCube = None):
+    summary_data = build_summary(financial_data, budgets, cube)
 
-    category_spending = debits_df.groupby('Category')['Amount'].sum().to_dict()
+    prompt = f"You are an AI expert financial coach. Analyze the following financial data. Provide a short-term and a long-term financial goal for the user.\nFinancial Data:\n{summary_data}"
 
-    prompt = f"You are an AI expert financial coach. Analyze the following financial data. Provide a short-term and a long-term financial goal for the user.\nFinancial Data:\n{financial_data}"
-    
+    return prompt
 
-    analysis_response = client.models.generate_content(model= "gemini-2.5-flash", contents= prompt)
-    
-    return analysis_response.text
+def analysis(financial_data: pd.DataFrame, budgets: dict = None, cube: AggregateCube = None):
+    key = _cache_key("analysis", financial_data, budgets)
+    return _generate(key, lambda: _analysis_prompt(financial_data, budgets, cube))
+
+# the first analysis of a session runs here so the dashboard doesn't wait on it
+_analysis_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="analysis")
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+def submit_analysis(financial_data: pd.DataFrame, budgets: dict = None, cube: AggregateCube = None) -> Future:
+    """
+    Run analysis() on a worker thread and return its Future. While it runs, sessions
+    asking about the same data and budgets get that Future instead of a new request.
+    """
+    key = data_fingerprint(financial_data, budgets)
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        if future is not None:
+            return future
+        future = _in_flight[key] = _analysis_pool.submit(analysis, financial_data, budgets, cube)
+    future.add_done_callback(lambda done: _forget(key, done))
+    return future
 
-    
\ No newline at end of file
+def _forget(key: str, future: Future):
+    with _in_flight_lock:
+        if _in_flight.get(key) is future:
+            del _in_flight[key]
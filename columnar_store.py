@@ -0,0 +1,120 @@
+import os
+import glob
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import perf
+
+'''
+Typed, columnar on-disk copy of the transaction history.
+
+The history is a directory of Arrow IPC files (part-00000.arrow, part-00001.arrow, ...).
+Appends write a new small part instead of rewriting the history, and loading memory-maps
+every part, so nothing is parsed at startup. Columns are typed on disk:
+Date is a timestamp, Amount is fixed-point (int64 cents), and Category, Account Name
+and Transaction Type are dictionary-encoded. The CSV is only read once, to import it.
+'''
+
+AMOUNT_FIELD = pa.field('Amount', pa.int64(), metadata={'unit': 'cents'})
+DATE_TYPE = pa.timestamp('us')
+DICTIONARY_COLUMNS = ['Category', 'Account Name', 'Transaction Type']
+COMPACT_AFTER = 32
+# recomputed from the other columns at load, never written
+DERIVED_COLUMNS = ['MonthKey']
+
+def _parts(path: str):
+    return sorted(glob.glob(os.path.join(path, 'part-*.arrow')))
+
+def has_transactions(path: str) -> bool:
+    return len(_parts(path)) > 0
+
+def _is_text(values: pd.Series) -> bool:
+    return pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty') and not pd.api.types.is_numeric_dtype(values)
+
+def _to_table(df: pd.DataFrame) -> pa.Table:
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if col in DERIVED_COLUMNS:
+            continue
+        if col == 'Date':
+            columns[col] = pa.array(pd.to_datetime(values), type=DATE_TYPE)
+        elif col == 'Amount':
+            dollars = pd.to_numeric(values).to_numpy(dtype=float, na_value=np.nan)
+            cents = np.round(dollars * 100)
+            columns[col] = pa.array(cents, mask=np.isnan(cents), type=pa.float64()).cast(pa.int64())
+        elif col in DICTIONARY_COLUMNS:
+            columns[col] = pa.array(values.astype(object), type=pa.string(), from_pandas=True).dictionary_encode()
+        elif isinstance(values.dtype, pd.CategoricalDtype) or _is_text(values):
+            # text is always written as string: pandas' str dtype would otherwise come out as
+            # large_string, and parts with both types can't be read back together
+            columns[col] = pa.array(values.astype(object), type=pa.string(), from_pandas=True)
+        else:
+            columns[col] = pa.array(values, from_pandas=True)
+    table = pa.table(columns)
+    if 'Amount' in columns:
+        table = table.set_column(table.column_names.index('Amount'), AMOUNT_FIELD, table.column('Amount'))
+    return table
+
+def _write_part(table: pa.Table, path: str, number: int):
+    os.makedirs(path, exist_ok=True)
+    target = os.path.join(path, f'part-{number:05d}.arrow')
+    tmp = target + '.tmp'
+    with pa.OSFile(tmp, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, target)
+
+def _next_part_number(path: str) -> int:
+    parts = _parts(path)
+    if not parts:
+        return 0
+    return int(os.path.basename(parts[-1])[len('part-'):-len('.arrow')]) + 1
+
+def save_transactions(df: pd.DataFrame, path: str):
+    """Replace the stored history with df as a single part."""
+    old_parts = _parts(path)
+    number = _next_part_number(path)
+    _write_part(_to_table(df), path, number)
+    for part in old_parts:
+        os.remove(part)
+
+def append_transactions(df: pd.DataFrame, path: str):
+    """Store new transactions as their own part; the existing parts are not touched."""
+    if df.empty:
+        return
+    _write_part(_to_table(df), path, _next_part_number(path))
+
+def _string_columns(table: pa.Table) -> pa.Table:
+    # parts written before text was pinned to string may hold large_string columns
+    for i, field in enumerate(table.schema):
+        if pa.types.is_large_string(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+    return table
+
+def _read_table(path: str) -> pa.Table:
+    tables = [_string_columns(pa.ipc.open_file(pa.memory_map(part, 'r')).read_all()) for part in _parts(path)]
+    if len(tables) == 1:
+        return tables[0]
+    try:
+        table = pa.concat_tables(tables, promote_options='default')
+    except TypeError:
+        table = pa.concat_tables(tables, promote=True)
+    return table.unify_dictionaries()
+
+@perf.timed()
+def load_transactions(path: str) -> pd.DataFrame:
+    """Memory-map the stored history and return it as a DataFrame (amounts as float dollars)."""
+    table = _read_table(path)
+    if 'Amount' in table.column_names:
+        # whole cents divided by 100 land on the same float the CSV text parses to
+        i = table.column_names.index('Amount')
+        dollars = pc.divide(table.column('Amount').cast(pa.float64()), 100.0)
+        table = table.set_column(i, 'Amount', dollars)
+    df = table.to_pandas(split_blocks=True)
+
+    # many small appended parts make loading slower, so fold them into one now and then
+    if len(_parts(path)) > COMPACT_AFTER:
+        save_transactions(df, path)
+    return df
@@ -0,0 +1,71 @@
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+'''
+Compact in-memory schema for the transaction history.
+Text columns whose values repeat (categories, accounts, transaction types and usually
+merchants) become categoricals: one small integer code per row plus one copy of each
+distinct string, instead of a pointer and a string object per row. MonthKey is the
+month as an int32 (months since 1970-01, the same number as the month Period's ordinal),
+computed once at load so month filters and rollups compare integers instead of building
+Period columns on every rerun. Amount stays float64 dollars, the unit every chart,
+forecast and anomaly check works in.
+'''
+
+CATEGORY_COLUMNS = ['Category', 'Account Name', 'Transaction Type', 'Description']
+# a text column is made categorical when each distinct value appears at least this often on average
+MIN_REPEATS = 2
+MISSING_MONTH = np.iinfo(np.int32).min
+
+def month_key(dates) -> np.ndarray:
+    """int32 months since 1970-01 for each date; MISSING_MONTH where there is no date."""
+    months = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[ns]').astype('datetime64[M]')
+    keys = months.astype(np.int64)
+    keys[np.isnat(months)] = MISSING_MONTH
+    return keys.astype(np.int32)
+
+def month_periods(keys) -> pd.PeriodIndex:
+    """The monthly Periods for month keys, NaT for MISSING_MONTH."""
+    ordinals = np.asarray(keys, dtype=np.int64)
+    ordinals = np.where(ordinals == MISSING_MONTH, np.iinfo(np.int64).min, ordinals)
+    return pd.PeriodIndex.from_ordinals(ordinals, freq='M')
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """df in the compact schema, with MonthKey added when there is a Date column."""
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if col == 'Date':
+            values = pd.to_datetime(values)
+        elif col == 'Amount':
+            values = pd.to_numeric(values).astype(np.float64)
+        elif col in CATEGORY_COLUMNS and not isinstance(values.dtype, pd.CategoricalDtype):
+            if values.nunique(dropna=True) * MIN_REPEATS <= len(values):
+                values = values.astype('category')
+        columns[col] = values
+    if 'Date' in columns and 'MonthKey' not in columns:
+        columns['MonthKey'] = month_key(columns['Date'])
+    return pd.DataFrame(columns, index=df.index)
+
+def plain(df: pd.DataFrame) -> pd.DataFrame:
+    """df the way it was held before compaction: text as Python strings, no MonthKey."""
+    def as_strings(values):
+        text = isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(values)
+        return pd.Series(values.to_numpy(dtype=object), index=values.index, dtype=object) if text else values
+
+    columns = {col: as_strings(df[col]) for col in df.columns if col != 'MonthKey'}
+    return pd.DataFrame(columns, index=df.index)
+
+def bytes_per_row(df: pd.DataFrame) -> Dict[str, float]:
+    """Bytes per row of every column (strings included) and the total."""
+    usage = df.memory_usage(deep=True, index=False) / max(1, len(df))
+    report = {col: float(n) for col, n in usage.items()}
+    report['total'] = float(usage.sum())
+    return report
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Bytes per row by column before and after compaction."""
+    report = pd.DataFrame({'Before': pd.Series(bytes_per_row(before)), 'After': pd.Series(bytes_per_row(after))})
+    report = report.reindex([c for c in report.index if c != 'total'] + ['total'])
+    return report.fillna(0.0)
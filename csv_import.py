@@ -0,0 +1,180 @@
+import os
+import time
+import warnings
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import perf
+
+'''
+Streaming import of bank-export CSVs.
+The file is read in chunks with every column typed as a string up front (no dtype
+inference pass, no mixed-type columns), and each chunk is normalized, validated and
+appended to the transaction store before the next one is read, so memory stays at
+about one chunk however large the export is. Rows that fail validation are collected
+with their line number and the reason instead of failing the whole file.
+'''
+
+COLUMNS = ['Date', 'Description', 'Amount', 'Transaction Type', 'Category', 'Account Name']
+DATE_FORMAT = '%m/%d/%Y'
+TRANSACTION_TYPES = ('debit', 'credit')
+CHUNK_ROWS = 100_000
+# errors beyond this are only counted, so a file of garbage can't fill memory with messages
+MAX_ERRORS = 1000
+
+def _size(source) -> Optional[int]:
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if hasattr(source, 'getbuffer'):
+        return source.getbuffer().nbytes
+    if hasattr(source, 'size'):
+        return source.size
+    return None
+
+def _position(handle) -> Optional[int]:
+    try:
+        return handle.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def _per_value(values: pd.Series, normalize) -> pd.Series:
+    """normalize() applied to each distinct value once and mapped back onto every row."""
+    codes, uniques = pd.factorize(values)
+    normalized = normalize(pd.Series(uniques, dtype=object))
+    # code -1 (missing) picks the appended missing value
+    normalized = pd.concat([normalized, pd.Series([None], dtype=object)], ignore_index=True).astype(normalized.dtype)
+    return pd.Series(normalized.to_numpy()[codes], index=values.index, dtype=normalized.dtype)
+
+def _strip(values: pd.Series) -> pd.Series:
+    return values.str.strip().replace('', None).astype(object)
+
+def validate_chunk(chunk: pd.DataFrame, first_line: int) -> Tuple[pd.DataFrame, List[Dict]]:
+    """
+    Normalize one raw chunk (all strings) into store rows. Returns the valid rows and a
+    {'line', 'error'} entry per rejected row; first_line is the file line of chunk's first row.
+    """
+    # exports repeat the same dates, merchants and categories many times over, so every
+    # column is normalized per distinct value, which also shares one string per value
+    dates = _per_value(chunk['Date'], lambda v: pd.to_datetime(v.str.strip(), format=DATE_FORMAT, errors='coerce'))
+    amounts = _per_value(chunk['Amount'], lambda v: pd.to_numeric(
+        v.str.strip().str.replace(r'[$,]', '', regex=True), errors='coerce').astype(float))
+    types = _per_value(chunk['Transaction Type'], lambda v: _strip(v).str.lower())
+    text = {col: _per_value(chunk[col], _strip) for col in ('Description', 'Category', 'Account Name')}
+
+    problems = {
+        'invalid date': dates.isna(),
+        'invalid amount': amounts.isna() | (amounts < 0),
+        'transaction type must be debit or credit': ~types.isin(TRANSACTION_TYPES),
+        'missing description': text['Description'].isna(),
+    }
+    bad = np.zeros(len(chunk), dtype=bool)
+    for mask in problems.values():
+        bad |= mask.to_numpy()
+
+    errors = []
+    for i in np.flatnonzero(bad):
+        reasons = [name for name, mask in problems.items() if mask.iat[i]]
+        errors.append({'line': first_line + int(i), 'error': ', '.join(reasons)})
+
+    good = ~bad
+    rows = pd.DataFrame({
+        'Date': dates[good],
+        'Description': text['Description'][good],
+        'Amount': amounts[good],
+        'Transaction Type': types[good],
+        'Category': text['Category'][good],
+        'Account Name': text['Account Name'][good],
+    }).reset_index(drop=True)
+    return rows, errors
+
+def _chunks(reader):
+    # a malformed line stops the import with its message, rather than silently losing fields
+    while True:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', pd.errors.ParserWarning)
+            try:
+                chunk = next(reader)
+            except StopIteration:
+                return
+            except (pd.errors.ParserError, pd.errors.ParserWarning) as e:
+                raise ValueError(f"Could not parse CSV: {e}") from None
+        yield chunk
+
+def read_chunks(source, chunk_rows: int = CHUNK_ROWS) -> Iterator[Tuple[pd.DataFrame, List[Dict], float]]:
+    """Yield (valid rows, row errors, fraction of the file read) per chunk of source (a path or file)."""
+    total = _size(source)
+    handle = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+    try:
+        # index_col=False: a row with an extra field must not turn the first column into an index
+        reader = pd.read_csv(handle, dtype=object, keep_default_na=False, na_values=[''],
+                             skipinitialspace=True, index_col=False, chunksize=chunk_rows)
+        # line 1 is the header
+        line = 2
+        for chunk in _chunks(reader):
+            chunk.columns = [str(col).strip() for col in chunk.columns]
+            missing = [col for col in COLUMNS if col not in chunk.columns]
+            if missing:
+                raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+            rows, errors = validate_chunk(chunk[COLUMNS].copy(), line)
+            line += len(chunk)
+            position = _position(handle)
+            progress = min(1.0, position / total) if total and position is not None else None
+            yield rows, errors, progress
+    finally:
+        if handle is not source:
+            handle.close()
+
+def _add_chunk(report: Dict, rows: pd.DataFrame, errors: List[Dict], store, duplicate_index, duplicates,
+               skip_repeats: bool, on_chunk):
+    if duplicates is not None and not rows.empty:
+        recorded, repeated = duplicates.check(rows)
+        report['duplicates'] += int(recorded.sum())
+        report['repeats'] += int(repeated.sum())
+        skipped = recorded | repeated if skip_repeats else recorded
+        rows = rows[~skipped].reset_index(drop=True)
+    if not rows.empty:
+        store.extend(rows)
+        if duplicate_index is not None:
+            duplicate_index.add_many(rows)
+        if on_chunk is not None:
+            on_chunk(rows)
+    report['rows'] += len(rows)
+    report['error_count'] += len(errors)
+    report['errors'].extend(errors[:MAX_ERRORS - len(report['errors'])])
+
+@perf.timed()
+def import_csv(source, store, duplicate_index=None, chunk_rows: int = CHUNK_ROWS,
+               on_chunk: Callable[[pd.DataFrame], None] = None,
+               on_progress: Callable[[Dict], None] = None, skip_repeats: bool = False) -> Dict:
+    """
+    Stream source into store chunk by chunk. Rows already in duplicate_index are skipped
+    and the index is updated with what was added. Identical rows within the file are
+    separate transactions unless the history already holds as many copies; the extra
+    copies are imported and counted as 'repeats', or skipped with skip_repeats.
+    on_chunk(rows) runs after each append (e.g. to persist it) and on_progress(report)
+    after each chunk. Returns the final report: 'rows' added, 'duplicates' skipped,
+    'repeats', 'errors' (up to MAX_ERRORS), 'error_count', 'progress', 'seconds' and
+    'error', set if the file itself could not be read. The chunks before such an error
+    stay imported.
+    """
+    start = time.perf_counter()
+    report = {'rows': 0, 'duplicates': 0, 'repeats': 0, 'errors': [], 'error_count': 0, 'progress': 0.0,
+              'seconds': 0.0, 'error': None}
+    duplicates = duplicate_index.batch() if duplicate_index is not None else None
+    chunks = read_chunks(source, chunk_rows)
+    while True:
+        try:
+            rows, errors, progress = next(chunks)
+        except StopIteration:
+            report['progress'] = 1.0
+            break
+        except ValueError as e:
+            report['error'] = str(e)
+            break
+        _add_chunk(report, rows, errors, store, duplicate_index, duplicates, skip_repeats, on_chunk)
+        report['progress'] = progress
+        report['seconds'] = time.perf_counter() - start
+        if on_progress is not None:
+            on_progress(report)
+    report['seconds'] = time.perf_counter() - start
+    return report
@@ -0,0 +1,215 @@
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+'''
+Duplicate detection for new transactions.
+Every transaction is normalized to (day, description, amount in cents, transaction type,
+account), with text lowercased and whitespace collapsed, and reduced to a 64-bit hash.
+The hashes live in a sorted numpy array (8 bytes a row, repeats kept) plus a small
+counter of recent additions that is merged in now and then, so a check is a dict lookup
+and a binary search however long the history is, and adding rows only hashes the new ones.
+
+Matching counts copies: two identical purchases on one day are two transactions, so
+the k-th copy of a row in a batch is only a duplicate when the history already holds
+k copies. Copies beyond that are reported as repeats within the batch, not dropped.
+
+The near-duplicate mode ignores the description (OCR and bank exports spell merchants
+differently) and matches on account and type with tolerances on the date and amount.
+It keeps one sorted (account and type, day) key and the amount per row.
+'''
+
+MERGE_AT = 4096
+_DAY_OFFSET = 1 << 31
+
+def _text(value) -> str:
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ''
+    return ' '.join(str(value).split()).lower()
+
+def _text_column(df: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in df.columns:
+        return np.full(len(df), '', dtype=object)
+    # normalize each distinct value once; merchants, types and accounts repeat a lot
+    codes, uniques = pd.factorize(df[name])
+    return np.array([_text(u) for u in uniques] + [''], dtype=object)[codes]
+
+def _days_cents(dates: np.ndarray, amounts: np.ndarray):
+    dated = ~np.isnat(dates)
+    day = np.where(dated, dates.astype('datetime64[D]').astype(np.int64), 0)
+    cents = np.where(np.isnan(amounts), -1, np.round(np.nan_to_num(amounts) * 100)).astype(np.int64)
+    return day, dated, cents
+
+def _frame_columns(df: pd.DataFrame):
+    dates = pd.to_datetime(df['Date'], errors='coerce') if 'Date' in df.columns else pd.Series(pd.NaT, index=df.index)
+    amounts = pd.to_numeric(df['Amount'], errors='coerce') if 'Amount' in df.columns else pd.Series(np.nan, index=df.index)
+    day, dated, cents = _days_cents(dates.to_numpy(dtype='datetime64[ns]'), amounts.to_numpy(dtype=float, na_value=np.nan))
+    texts = [_text_column(df, name) for name in ('Description', 'Transaction Type', 'Account Name')]
+    return (day, dated, cents, *texts)
+
+def _row_columns(row: dict):
+    # the same columns as _frame_columns for a single row, without building a DataFrame
+    try:
+        date = pd.Timestamp(row.get('Date')).to_datetime64()
+    except (TypeError, ValueError):
+        date = np.datetime64('NaT')
+    try:
+        amount = float(row.get('Amount'))
+    except (TypeError, ValueError):
+        amount = np.nan
+    day, dated, cents = _days_cents(np.array([date], dtype='datetime64[ns]'), np.array([amount]))
+    texts = [np.array([_text(row.get(name))], dtype=object) for name in ('Description', 'Transaction Type', 'Account Name')]
+    return (day, dated, cents, *texts)
+
+def _combine(*arrays) -> np.ndarray:
+    # categorizing first only pays off on long arrays; the hashes are the same either way
+    categorize = len(arrays[0]) > 64
+    hashed = pd.util.hash_array(arrays[0], categorize=categorize)
+    with np.errstate(over='ignore'):
+        for array in arrays[1:]:
+            hashed = hashed * np.uint64(1000003) ^ pd.util.hash_array(array, categorize=categorize)
+    return hashed
+
+def _parts(row):
+    """Per row: exact hash, near-mode group and day key, amount in cents, and whether the date is known."""
+    day, dated, cents, description, kind, account = _frame_columns(row) if isinstance(row, pd.DataFrame) else _row_columns(row)
+    exact = _combine(np.where(dated, day, np.iinfo(np.int64).min), description, cents, kind, account)
+    groups = _combine(kind, account)
+    # top 32 bits of the group hash, then the day, so one group's days sort next to each other
+    near = (groups >> np.uint64(32) << np.uint64(32)) | (day + _DAY_OFFSET).astype(np.uint64)
+    return exact, near, cents, dated
+
+def _counts(sorted_values: np.ndarray, pending: dict, values: np.ndarray) -> np.ndarray:
+    counts = np.searchsorted(sorted_values, values, side='right') - np.searchsorted(sorted_values, values, side='left')
+    if pending:
+        counts += np.fromiter((pending.get(h, 0) for h in values.tolist()), dtype=np.int64, count=len(values))
+    return counts
+
+def _near_matches(keys, key_cents, near, cents, dated, days, tolerance) -> np.ndarray:
+    lo = np.searchsorted(keys, near - np.uint64(days), side='left')
+    hi = np.searchsorted(keys, near + np.uint64(days), side='right')
+    found = np.zeros(len(near), dtype=bool)
+    for i in np.flatnonzero(dated & (hi > lo)):
+        found[i] = (np.abs(key_cents[lo[i]:hi[i]] - cents[i]) <= tolerance).any()
+    return found
+
+
+class DuplicateIndex:
+    """Hash index of the transaction history; add rows as they are stored."""
+
+    def __init__(self, df: pd.DataFrame = None):
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._near_keys = np.empty(0, dtype=np.uint64)
+        self._near_cents = np.empty(0, dtype=np.int64)
+        self._pending = Counter()
+        self._pending_near = []
+        self._count = 0
+        if df is not None:
+            self.add_many(df)
+
+    def __len__(self):
+        return self._count
+
+    def add(self, row: dict):
+        self.add_many(row)
+
+    def add_many(self, df):
+        if len(df) == 0:
+            return
+        exact, near, cents, dated = _parts(df)
+        self._count += len(exact)
+        self._pending.update(exact.tolist())
+        self._pending_near.append((near[dated], cents[dated]))
+        if len(self._pending) >= MERGE_AT or len(exact) >= MERGE_AT:
+            self._merge()
+
+    def _merge(self):
+        if self._pending:
+            keys = np.fromiter(self._pending.keys(), dtype=np.uint64, count=len(self._pending))
+            copies = np.fromiter(self._pending.values(), dtype=np.int64, count=len(self._pending))
+            new = np.sort(np.repeat(keys, copies))
+            # a new array rather than in place, so batch() snapshots stay valid
+            self._hashes = np.insert(self._hashes, np.searchsorted(self._hashes, new), new)
+            self._pending = Counter()
+        if self._pending_near:
+            keys = np.concatenate([self._near_keys] + [k for k, _ in self._pending_near])
+            cents = np.concatenate([self._near_cents] + [c for _, c in self._pending_near])
+            order = np.argsort(keys, kind='stable')
+            self._near_keys, self._near_cents = keys[order], cents[order]
+            self._pending_near = []
+
+    def contains(self, row: dict) -> bool:
+        """Exact duplicate of a stored transaction."""
+        return bool(self.duplicates(row)[0])
+
+    def duplicates(self, df) -> np.ndarray:
+        """Boolean mask (df is a DataFrame or one row as a dict): rows matching a stored copy not matched by an earlier row of df."""
+        return DuplicateBatch(self, snapshot=False).check(df)[0]
+
+    def repeats(self, df) -> np.ndarray:
+        """Boolean mask: rows that are not duplicates but repeat an earlier row of df."""
+        return DuplicateBatch(self, snapshot=False).check(df)[1]
+
+    def batch(self) -> 'DuplicateBatch':
+        """Checker for one batch arriving in parts (e.g. the chunks of a CSV), matched against the history before it."""
+        return DuplicateBatch(self)
+
+    def near_duplicates(self, df, amount_tolerance: float = 0.01, days: int = 1) -> np.ndarray:
+        """
+        Boolean mask: rows with a stored transaction on the same account and type whose
+        amount is within amount_tolerance dollars and date within days days.
+        """
+        if len(df) == 0:
+            return np.zeros(0, dtype=bool)
+        _, near, cents, dated = _parts(df)
+        tolerance = int(round(amount_tolerance * 100))
+        found = _near_matches(self._near_keys, self._near_cents, near, cents, dated, days, tolerance)
+        if self._pending_near:
+            # recent additions are few, sort them here rather than re-sorting everything
+            keys = np.concatenate([k for k, _ in self._pending_near])
+            order = np.argsort(keys, kind='stable')
+            pending_cents = np.concatenate([c for _, c in self._pending_near])[order]
+            found |= _near_matches(keys[order], pending_cents, near, cents, dated, days, tolerance)
+        return found
+
+    def is_near_duplicate(self, row: dict, amount_tolerance: float = 0.01, days: int = 1) -> bool:
+        return bool(self.near_duplicates(row, amount_tolerance, days)[0])
+
+
+class DuplicateBatch:
+    """
+    Exact matching of one batch against the history as it was when the batch started,
+    so rows of earlier parts that were added to the index in the meantime count as
+    repeats within the batch, not as already recorded.
+    """
+
+    def __init__(self, index: DuplicateIndex, snapshot: bool = True):
+        self._index = index
+        self._hashes = index._hashes
+        self._pending = Counter(index._pending) if snapshot else index._pending
+        self._snapshot = snapshot
+        # copies seen in earlier parts, only for rows the history already had
+        self._seen = Counter()
+
+    def check(self, df):
+        """(duplicates, repeats) boolean masks for the next part of the batch."""
+        if len(df) == 0:
+            return np.zeros(0, dtype=bool), np.zeros(0, dtype=bool)
+        exact = _parts(df)[0]
+        before = _counts(self._hashes, self._pending, exact)
+        # how many copies of each row came earlier in the batch
+        if len(exact) > 1:
+            earlier = pd.Series(exact).groupby(exact).cumcount().to_numpy(dtype=np.int64, copy=True)
+        else:
+            earlier = np.zeros(1, dtype=np.int64)
+        known = np.flatnonzero(before > 0)
+        if len(known):
+            known_hashes = exact[known].tolist()
+            earlier[known] += np.fromiter((self._seen[h] for h in known_hashes), dtype=np.int64, count=len(known))
+            self._seen.update(known_hashes)
+        duplicate = earlier < before
+        repeat = ~duplicate & (earlier > 0)
+        if self._snapshot:
+            # rows of earlier parts that went into the index show up as extra copies
+            repeat |= ~duplicate & (_counts(self._index._hashes, self._index._pending, exact) > before)
+        return duplicate, repeat
@@ -1,7 +1,8 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple
+from typing import Dict, Optional, Tuple, Union
+import perf
 
 '''
 We are making a future spending forecastbased on the data we gathered from the past .
@@ -9,107 +10,192 @@ basically getting more data ahead to have the coach work more efficiently with a
 persnalized resul.t
 '''
 
-def frcst( df: pd.DataFrame, frcst_m: int = 3,trsnctn_ty: str= 'debit')-> Dict:
+@perf.timed()
+def frcst( df: pd.DataFrame, frcst_m: int = 3,trsnctn_ty: str= 'debit', cube=None)-> Dict:
+    """cube: optional AggregateCube of df; the monthly sums are then read from it instead of the rows."""
     if df.empty or 'Date' not in df.columns or 'Amount' not in df.columns:
         return mt_frcst(frcst_m)
-    
-    if 'Transaction Type' in df.columns:
-        df = df[df['Transaction Type'] == trsnctn_ty].copy()
 
-    if df.empty:
-        return mt_frcst(frcst_m)
-    
-    df['Date']= pd.to_datetime(df['Date'])
+    if cube is not None and 'Transaction Type' in df.columns:
+        monthly = cube.rollup(['Category', 'YearMonth'], where={'Transaction Type': trsnctn_ty}, dropna=False).reset_index()
+        if monthly.empty:
+            return mt_frcst(frcst_m)
+        fc = frcst_many(monthly.assign(Series=trsnctn_ty), frcst_m, amt_col='sum')
+        if fc['n_months'][0] <2:
+            return _simple_average_forecast(df, frcst_m, avg_monthly=monthly['sum'].sum() / max(1, fc['n_months'][0]))
+        frcst_cat = frcstby_cat(monthly, frcst_m, month_col='YearMonth', amt_col='sum', count_col='count')
+    else:
+        if 'Transaction Type' in df.columns:
+            df = df[df['Transaction Type'] == trsnctn_ty].copy()
 
-    df['YearMonth']=  df['Date'].dt.to_period('M')
-    m_tot = df.groupby('YearMonth')['Amount'].sum().sort_index()
-    if len(m_tot) <2:
-        return _simple_average_forecast(df, frcst_m)
-    
-    frcst_cat = frcstby_cat(df, frcst_m)
-    tot_frcst = frcst_tot(m_tot, frcst_m)
-    trnd = _detect_trend(m_tot)
+        if df.empty:
+            return mt_frcst(frcst_m)
+
+        df['Date']= pd.to_datetime(df['Date'])
+
+        df['YearMonth']=  df['Date'].dt.to_period('M')
+        df['Series'] = trsnctn_ty
+        fc = frcst_many(df, frcst_m)
+        if fc['n_months'][0] <2:
+            return _simple_average_forecast(df, frcst_m)
+
+        frcst_cat = frcstby_cat(df, frcst_m)
     return {
         'forecast_category': frcst_cat,
-        'total_forecast': tot_frcst,
+        'total_forecast': _series_forecast(fc, 0),
         'forecast_months': frcst_m,
-        'trend': trnd,
+        'trend': fc['trend'][0],
         'transaction_type': trsnctn_ty,
-        'past_avg': m_tot.mean()
+        'past_avg': fc['past_avg'][0]
     }
 
 # we're gettin the spending forecast for every single category used here
-def frcstby_cat(df: pd.DataFrame, frcst_m: int)-> Dict:
+# all categories are forecast together from one category x month matrix
+# df can also be monthly sums already (e.g. a cube rollup): count_col then says how many
+# transactions each row holds, for the average transaction fallback
+@perf.timed()
+def frcstby_cat(df: pd.DataFrame, frcst_m: int, month_col: str = 'Date', amt_col: str = 'Amount',
+                count_col: Optional[str] = None)-> Dict:
     if 'Category' not in df.columns:
         return {}
-    frcst_cat= {}
-    df['YearMonth']=  df['Date'].dt.to_period('M')
-    for category in df['Category'].unique():
-        if pd.isna(category):
-            continue
-        cat_df = df[df['Category']==category]
-        m_cat = cat_df.groupby('YearMonth')['Amount'].sum().sort_index()
-        if len(m_cat)<2:
-            avg = cat_df['Amount'].mean()
-            frcst_val = [avg]*frcst_m
+    cats, months, m_tot, seen = _series_month_matrix(df['Category'], df[month_col], df[amt_col])
+    if len(cats) == 0:
+        return {}
+
+    # each category's own months, in order, are x = 0..n-1 (gaps are skipped, not zero-filled)
+    x = np.cumsum(seen, axis=1) - 1
+    # least squares slope, the same fit np.polyfit(x, y, 1) gives per category
+    trnd_sl, _, y_bar, n = _masked_fit(x, m_tot, seen)
+
+    # exponential weights from e^-1 (oldest month) to e^0 (latest month)
+    w = np.exp(-1 + x / np.maximum(n - 1, 1)[:, None]) * seen
+    w_avg = (w * m_tot).sum(axis=1) / np.maximum(w.sum(axis=1), 1e-300)
+
+    steps = np.arange(1, frcst_m + 1)
+    frcst_vals = np.maximum(0, w_avg[:, None] + trnd_sl[:, None] * steps)
+
+    # categories with fewer than two months fall back to their average transaction
+    txn_avg = np.full(len(cats), np.nan)
+    if (n < 2).any():
+        codes = pd.factorize(df['Category'])[0]
+        if count_col is None:
+            txn_avg = df[amt_col].groupby(codes).mean().reindex(range(len(cats))).to_numpy()
         else:
-            w = np.exp(np.linspace(-1, 0, len(m_cat)))
-            w/= w.sum()
-            w_avg = np.sum(m_cat.values*w)
-            x = np.arange(len(m_cat))
-            y =m_cat.values
-            z= np.polyfit(x, y, 1)
-            trnd_sl = z[0]
-
-            frcst_val= []
-            for i in range(1, frcst_m+1):
-                val =w_avg+(trnd_sl*i)
-                val =max(0, val)
-                frcst_val.append(val)
+            sums = df[[amt_col, count_col]].groupby(codes).sum().reindex(range(len(cats)))
+            txn_avg = (sums[amt_col] / sums[count_col]).to_numpy()
+    last_col = seen.shape[1] - 1 - np.argmax(seen[:, ::-1], axis=1)
+    last_month = np.where(n > 0, m_tot[np.arange(len(cats)), last_col], 0)
+    hist_avg = np.where(n > 0, y_bar, txn_avg)
 
+    frcst_cat= {}
+    for i, category in enumerate(cats):
+        if n[i] < 2:
+            frcst_val = [txn_avg[i]]*frcst_m
+        else:
+            frcst_val = frcst_vals[i].tolist()
         frcst_cat[category]={
             'forecasted_amounts':frcst_val,
-            'historical_average': m_cat.mean() if len(m_cat)>0 else cat_df['Amount'].mean(),
-            'last_month': m_cat.iloc[-1] if len(m_cat)>0 else 0          
+            'historical_average': hist_avg[i],
+            'last_month': last_month[i]
         } 
     return frcst_cat
 
+def _series_month_matrix(keys: pd.Series, months: pd.Series, amounts: pd.Series):
+    """
+    Monthly totals for every series as one dense (series x months) array.
+    months can be dates or monthly periods. Returns (series, months, totals, seen) where
+    seen marks the months a series has rows in. Series keep their order of first
+    appearance and months are sorted.
+    """
+    if not isinstance(months.dtype, pd.PeriodDtype):
+        months = pd.to_datetime(months).dt.to_period('M')
+    key_codes, keys = pd.factorize(keys)
+    m_codes, months = pd.factorize(months, sort=True)
+    keep = (key_codes >= 0) & (m_codes >= 0)
+    flat = key_codes[keep] * len(months) + m_codes[keep]
+    size = len(keys) * len(months)
+    values = np.nan_to_num(amounts.to_numpy(dtype=float, na_value=np.nan)[keep])
+    m_tot = np.bincount(flat, weights=values, minlength=size).reshape(len(keys), len(months))
+    seen = np.bincount(flat, minlength=size).reshape(len(keys), len(months)) > 0
+    return list(keys), months, m_tot, seen
+
+def _masked_fit(x: np.ndarray, y: np.ndarray, mask: np.ndarray):
+    """Least squares line through the masked points of every row: (slope, intercept, mean y, n)."""
+    n = mask.sum(axis=1)
+    n_safe = np.maximum(n, 1)
+    x_bar = np.where(mask, x, 0).sum(axis=1) / n_safe
+    y_bar = np.where(mask, y, 0).sum(axis=1) / n_safe
+    dx = np.where(mask, x - x_bar[:, None], 0.0)
+    sxx = (dx ** 2).sum(axis=1)
+    slope = (dx * np.where(mask, y - y_bar[:, None], 0.0)).sum(axis=1) / np.where(sxx > 0, sxx, 1)
+    return slope, y_bar - slope * x_bar, y_bar, n
+
 def frcst_tot(m_tot: pd.Series, frcst_m:int)->Dict:
-    v= m_tot.values
-    alpha=0.3
-    smoothed =[v[0]]
-    for i in range(1, len(v)):
-        smoothed.append(alpha*v[i]+(1-alpha)*smoothed[i-1])
-
-    x = np.arange(len(v))
-    z = np.polyfit(x, v, 1)
-    trns_sl = z[0]
-    trnd_int = z[1]
-    last_x = len(v) - 1
-    frcst_value = []
-    l_bnd = []
-    u_bnd = []
-    std = np.std(v)
-
-    for i in range(1, frcst_m + 1):
-        trnd_frcst = trnd_int + trns_sl * (last_x + i)
-        frcst_val = 0.7 * trnd_frcst + 0.3 * smoothed[-1]
-        frcst_val = max(0, frcst_val)
-        frcst_value.append(frcst_val)
-        l_bnd.append(max(0, frcst_val - 1.96 * std))
-        u_bnd.append(frcst_val + 1.96 * std)
-    
-    # Generate forecast dates
-    last_date = m_tot.index[-1].to_timestamp()
-    forecast_dates = [(last_date + pd.DateOffset(months=i)).strftime('%Y-%m') 
-                     for i in range(1, frcst_m + 1)]
-    
+    long_df = pd.DataFrame({'Series': 0, 'YearMonth': m_tot.index, 'Amount': m_tot.values})
+    return _series_forecast(frcst_many(long_df, frcst_m), 0)
+
+# many series (users, accounts, categories...) forecast at once, the same way frcst_tot does one
+def frcst_many(long_df: pd.DataFrame, frcst_m: int = 3, id_col: str = 'Series',
+               month_col: str = 'YearMonth', amt_col: str = 'Amount', alpha: float = 0.3) -> Dict:
+    """
+    Forecast every series in a long-format frame keyed by (id_col, month_col).
+
+    Rows that share a series and month are summed, so transaction-level rows work too.
+    Every value is an array with one entry (or one row of frcst_m entries) per series,
+    in order of first appearance; _series_forecast() turns one of them back into the
+    dict frcst_tot returns.
+    """
+    keys, months, v, seen = _series_month_matrix(long_df[id_col], long_df[month_col], long_df[amt_col])
+    x = np.cumsum(seen, axis=1) - 1
+    slope, intercept, past_avg, n = _masked_fit(x, v, seen)
+
+    # exponential smoothing s_t = alpha * v_t + (1 - alpha) * s_t-1 unrolled into weights
+    age = np.where(seen, (n - 1)[:, None] - x, 0)
+    w = np.where(x > 0, alpha, 1.0) * (1 - alpha) ** age * seen
+    level = (w * v).sum(axis=1)
+
+    std = np.sqrt(np.where(seen, (v - past_avg[:, None]) ** 2, 0).sum(axis=1) / np.maximum(n, 1))
+
+    steps = np.arange(1, frcst_m + 1)
+    trnd_frcst = intercept[:, None] + slope[:, None] * ((n - 1)[:, None] + steps)
+    amounts = np.maximum(0, 0.7 * trnd_frcst + 0.3 * level[:, None])
+    l_bnd = np.maximum(0, amounts - 1.96 * std[:, None])
+    u_bnd = amounts + 1.96 * std[:, None]
+
+    # trend over the last six months (or fewer), same rule as _detect_trend
+    recent = seen & (x >= (n - 6)[:, None])
+    r_slope, _, r_avg, r_n = _masked_fit(x, v, recent)
+    threshold = r_avg * 0.05
+    trend = np.where(r_slope > threshold, 'increasing', np.where(r_slope < -threshold, 'decreasing', 'stable'))
+    trend = np.where(r_n < 3, 'stable', trend)
+
+    last_col = seen.shape[1] - 1 - np.argmax(seen[:, ::-1], axis=1) if len(keys) else np.zeros(0, dtype=int)
+    last_ordinal = np.asarray(months.asi8)[last_col] if len(months) else np.zeros(len(keys), dtype=np.int64)
+    frcst_dates = pd.PeriodIndex.from_ordinals((last_ordinal[:, None] + steps).ravel(), freq='M')
+    dates = np.asarray(frcst_dates.strftime('%Y-%m'), dtype=object).reshape(len(keys), frcst_m)
+
     return {
-        'amounts': frcst_value,
-        'dates': forecast_dates,
+        'series': keys,
+        'amounts': amounts,
+        'dates': dates,
         'lower_bound': l_bnd,
         'upper_bound': u_bnd,
-        'average': np.mean(frcst_value)
+        'average': amounts.mean(axis=1) if frcst_m else np.zeros(len(keys)),
+        'trend': trend,
+        'slope': slope,
+        'smoothed_level': level,
+        'past_avg': past_avg,
+        'n_months': n,
+    }
+
+def _series_forecast(fc: Dict, i: int) -> Dict:
+    """One series out of frcst_many, in the frcst_tot format."""
+    return {
+        'amounts': fc['amounts'][i].tolist(),
+        'dates': fc['dates'][i].tolist(),
+        'lower_bound': fc['lower_bound'][i].tolist(),
+        'upper_bound': fc['upper_bound'][i].tolist(),
+        'average': fc['average'][i]
     }
 
 # just normal detection of the trend to make sure and chec the increas, decrease or any type
@@ -161,10 +247,11 @@ def mt_frcst(forecast_months: int) -> Dict:
     }
 
 
-def _simple_average_forecast(df: pd.DataFrame, forecast_months: int) -> Dict:
+def _simple_average_forecast(df: pd.DataFrame, forecast_months: int, avg_monthly: Optional[float] = None) -> Dict:
     """Simple average-based forecast when insufficient historical data."""
     
-    avg_monthly = df['Amount'].sum() / max(1, len(df['Date'].dt.to_period('M').unique()))
+    if avg_monthly is None:
+        avg_monthly = df['Amount'].sum() / max(1, len(df['Date'].dt.to_period('M').unique()))
     
     return {
         'category_forecasts': {},
@@ -182,10 +269,162 @@ def _simple_average_forecast(df: pd.DataFrame, forecast_months: int) -> Dict:
     }
 
 
+# a simulated month is the net flow of this many consecutive days of history
+RUNWAY_BLOCK_DAYS = 30
+# simulated months drawn per step; bounds the (months x paths x accounts) array of draws
+RUNWAY_CHUNK_MONTHS = 12
+TRANSFER_CATEGORY = 'Credit Card Payment'
+
+def _daily_flows(df: pd.DataFrame, accounts: Optional[list] = None, include_income: bool = True) -> np.ndarray:
+    """
+    Net flow (credits minus debits) of every day from the first to the last transaction,
+    as a (days x accounts) array; one column for all accounts when accounts is None.
+    Card payments move money between the user's own accounts, so they are left out of
+    the all-accounts column.
+    """
+    if accounts is None:
+        df = df[df['Category'] != TRANSFER_CATEGORY]
+        column = np.zeros(len(df), dtype=np.int64)
+        n_cols = 1
+    else:
+        column = pd.Categorical(df['Account Name'], categories=accounts).codes.astype(np.int64)
+        n_cols = len(accounts)
+    credit = (df['Transaction Type'] == 'credit').to_numpy()
+    amounts = np.nan_to_num(df['Amount'].to_numpy(dtype=float, na_value=np.nan))
+    signed = np.where(credit, amounts if include_income else 0.0, -amounts)
+
+    dates = pd.to_datetime(df['Date']).to_numpy(dtype='datetime64[D]')
+    keep = (column >= 0) & ~np.isnat(dates)
+    if not keep.any():
+        return np.zeros((0, n_cols))
+    days = (dates[keep] - dates[keep].min()).astype(np.int64)
+    n_days = int(days.max()) + 1
+    flat = days * n_cols + column[keep]
+    return np.bincount(flat, weights=signed[keep], minlength=n_days * n_cols).reshape(n_days, n_cols)
+
+def _simulate_runway(flows: np.ndarray, balances: np.ndarray, n_paths: int, horizon_m: int, rng) -> np.ndarray:
+    """
+    Months until each account's balance first drops to zero, on n_paths bootstrapped
+    futures (inf where it lasts past horizon_m). Every simulated month is a block of
+    RUNWAY_BLOCK_DAYS consecutive days of history starting on a random day, the same
+    block for every account of a path, so paychecks and bills keep their timing and
+    accounts stay in step. Balances are checked at each month's end; the month it runs
+    out in is split by how much of that month's outflow the balance still covered.
+    """
+    block = min(RUNWAY_BLOCK_DAYS, len(flows))
+    total = np.vstack([np.zeros((1, flows.shape[1])), np.cumsum(flows, axis=0)])
+    block_sums = total[block:] - total[:-block]
+
+    runway = np.full((n_paths, len(balances)), np.inf)
+    runway[:, balances <= 0] = 0.0
+    # accounts already at zero, or whose balance never moves, need no paths
+    active = np.flatnonzero((balances > 0) & (block_sums != 0).any(axis=0))
+    if len(active) == 0:
+        return runway
+    if len(active) < len(balances):
+        runway[:, active] = _simulate_runway(flows[:, active], balances[active], n_paths, horizon_m, rng)
+        return runway
+
+    # only paths with an account still above zero are carried forward
+    paths = np.arange(n_paths)
+    balance = np.tile(balances.astype(float), (n_paths, 1))
+    alive = np.isinf(runway)
+    for first in range(0, horizon_m, RUNWAY_CHUNK_MONTHS):
+        keep = alive.any(axis=1)
+        if not keep.any():
+            break
+        if not keep.all():
+            paths, balance, alive = paths[keep], balance[keep], alive[keep]
+        months = min(RUNWAY_CHUNK_MONTHS, horizon_m - first)
+        # (months x paths x accounts), one draw per path and month shared by its accounts
+        month_flows = np.take(block_sums, rng.integers(0, len(block_sums), size=(months, len(paths)), dtype=np.int32), axis=0)
+        start = balance.copy()
+        lowest = np.full_like(balance, np.inf)
+        for m in range(months):
+            balance += month_flows[m]
+            np.minimum(lowest, balance, out=lowest)
+
+        hit = alive & (lowest <= 0)
+        if hit.any():
+            # replay only the accounts that ran out to find the month they did
+            rows, cols = np.nonzero(hit)
+            flows_hit = month_flows[:, rows, cols]
+            running = start[rows, cols] + np.cumsum(flows_hit, axis=0)
+            month = np.argmax(running <= 0, axis=0)
+            k = np.arange(len(rows))
+            left = running[month, k] - flows_hit[month, k]
+            runway[paths[rows], cols] = first + month + left / -flows_hit[month, k]
+            alive[rows, cols] = False
+    return runway
+
+def _runway_stats(runway: np.ndarray, flows: np.ndarray, horizon_m: int) -> Dict:
+    """P10, median and P90 months of runway (None past the horizon) and the share of paths that run out."""
+    # inverted_cdf picks sampled values, so paths that never run out stay inf instead of becoming nan
+    p10, p50, p90 = (float(q) for q in np.quantile(runway, [0.1, 0.5, 0.9], method='inverted_cdf'))
+    return {
+        'p10_months': round(p10, 1) if np.isfinite(p10) else None,
+        'median_months': round(p50, 1) if np.isfinite(p50) else None,
+        'p90_months': round(p90, 1) if np.isfinite(p90) else None,
+        'depleted_share': float(np.isfinite(runway).mean()),
+        'avg_monthly_net': round(float(flows.sum()) / max(len(flows), 1) * RUNWAY_BLOCK_DAYS, 2),
+        'horizon_months': horizon_m,
+    }
+
+def simulate_runway(
+    df: pd.DataFrame,
+    bal_cur: Union[float, Dict[str, float]],
+    n_paths: int = 100_000,
+    horizon_m: int = 120,
+    include_income: bool = True,
+    seed: Optional[int] = None
+) -> Dict:
+    """
+    Monte Carlo runway: resample month-long blocks of the daily history into n_paths
+    futures and report the spread of months until the balance hits zero.
+
+    Args:
+        df: Transaction DataFrame
+        bal_cur: Current balance, or a dict of balances per account to simulate each account
+        n_paths: Number of simulated futures
+        horizon_m: Months simulated; runways longer than this are reported as None
+        include_income: False to simulate spending only (e.g. after losing the paycheck)
+        seed: Seed for a reproducible run
+
+    Returns:
+        Dictionary with the runway percentiles, for the total or for every account
+    """
+    rng = np.random.default_rng(seed)
+    accounts = list(bal_cur) if isinstance(bal_cur, dict) else None
+    flows = _daily_flows(df, accounts, include_income)
+    if len(flows) == 0:
+        return {'status': 'insufficient_data'}
+
+    balances = np.array([bal_cur[a] for a in accounts] if accounts else [bal_cur], dtype=float)
+    runway = _simulate_runway(flows, balances, n_paths, horizon_m, rng)
+    if accounts is None:
+        return {**_runway_stats(runway[:, 0], flows[:, 0], horizon_m), 'paths': n_paths}
+    return {
+        'accounts': {a: _runway_stats(runway[:, i], flows[:, i], horizon_m) for i, a in enumerate(accounts)},
+        'paths': n_paths,
+    }
+
+@perf.timed()
+def get_runway_simulation(store, bal_cur: Union[float, Dict[str, float]], n_paths: int = 100_000,
+                          horizon_m: int = 120, include_income: bool = True, seed: Optional[int] = None) -> Dict:
+    """simulate_runway() of the store's current data, run at most once per store version, balances and horizon."""
+    balances = tuple(sorted(bal_cur.items())) if isinstance(bal_cur, dict) else bal_cur
+    key = ('runway_simulation', balances, n_paths, horizon_m, include_income, seed)
+    return store.cached(key, lambda df: simulate_runway(df, bal_cur, n_paths, horizon_m, include_income, seed))
+
+@perf.timed()
 def get_budget_runway(
     df: pd.DataFrame, 
     budgets: Dict[str, float],
-    bal_cur: Optional[float] = None
+    bal_cur: Optional[Union[float, Dict[str, float]]] = None,
+    cube=None,
+    simulate: bool = False,
+    n_paths: int = 100_000,
+    seed: Optional[int] = None
 ) -> Dict:
     """
     Calculate how long current savings will last based on spending patterns.
@@ -193,7 +432,11 @@ def get_budget_runway(
     Args:
         df: Transaction DataFrame
         budgets: Dictionary of categorybudgets
-        current_balance: Current account balanc
+        current_balance: Current account balanc, or a dict of balances per account
+        cube: Optional AggregateCube of df to read the monthly spending from
+        simulate: Also run simulate_runway() and return its percentiles under 'simulation'
+        n_paths: Simulated futures when simulate is set
+        seed: Seed for the simulation
     
     Returns:
         Dictionary with runway estimates
@@ -201,14 +444,26 @@ def get_budget_runway(
     
     if df.empty or not budgets:
         return {'runway_months':0, 'status' : 'insufficient_data'}
+
+    if simulate and bal_cur:
+        runway = get_budget_runway(df, budgets, bal_cur, cube)
+        runway['simulation'] = simulate_runway(df, bal_cur, n_paths=n_paths, seed=seed)
+        return runway
+    if isinstance(bal_cur, dict):
+        bal_cur = sum(bal_cur.values())
     
     #Get recent monthly spendng (last 3 month
-    df = df[df['Transaction Type'] == 'debit'].copy()
-    df['YearMonth'] = pd.to_datetime(df['Date']).dt.to_period('M')
-    past_m = df['YearMonth'].unique()[-3:] if len(df['YearMonth'].unique()) >= 3 else df['YearMonth'].unique()
-    
-    recent_df = df[df['YearMonth'].isin(past_m)]
-    avg_m_spndg = recent_df.groupby('YearMonth')['Amount'].sum().mean()
+    if cube is not None:
+        # the cube's months are sorted, so the last three are the latest ones
+        avg_m_spndg = cube.rollup('YearMonth', where={'Transaction Type': 'debit'})['sum'].iloc[-3:].mean()
+    else:
+        df = df[df['Transaction Type'] == 'debit'].copy()
+        df['YearMonth'] = pd.to_datetime(df['Date']).dt.to_period('M')
+        # the latest three months by date, whatever order the rows are in
+        past_m = df['YearMonth'].dropna().sort_values().unique()[-3:]
+
+        recent_df = df[df['YearMonth'].isin(past_m)]
+        avg_m_spndg = recent_df.groupby('YearMonth')['Amount'].sum().mean()
     
     if bal_cur and bal_cur > 0 and avg_m_spndg > 0:
         runway_m = bal_cur / avg_m_spndg
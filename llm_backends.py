@@ -0,0 +1,208 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, Optional
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+'''
+Model backends behind the AI coach.
+Every backend has generate(model, prompt) -> str and stream(model, prompt), which yields
+the text in pieces. get_backend() builds the configured one once per process and hands
+the same instance to every caller, so connections are reused across chat messages.
+
+LLM_BACKEND picks the backend:
+    gemini  GeminiBackend, the real service (default, needs GEMINI_API_KEY)
+    http    HTTPBackend against LLM_URL, e.g. the stand-in server below
+    fake    FakeBackend, answers in-process without any network
+
+The stand-in server answers like a model would, after a configurable latency and jitter:
+
+    python -m llm_backends --port 8765 --latency 0.8 --jitter 0.3
+'''
+
+class GeminiBackend:
+    def __init__(self, api_key: Optional[str] = None):
+        from google import genai
+        self.client = genai.Client(api_key=api_key or os.getenv("GEMINI_API_KEY"))
+
+    def generate(self, model: str, prompt: str) -> str:
+        return self.client.models.generate_content(model=model, contents=prompt).text
+
+    def stream(self, model: str, prompt: str) -> Iterator[str]:
+        for chunk in self.client.models.generate_content_stream(model=model, contents=prompt):
+            if chunk.text:
+                yield chunk.text
+
+
+class HTTPBackend:
+    """
+    JSON over HTTP: POST /generate returns {"text": ...} and POST /stream returns one
+    {"text": ...} line per piece. Each thread keeps its own keep-alive connection.
+    """
+
+    def __init__(self, url: str, timeout: float = 60.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        self.https = parsed.scheme == 'https'
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self, fresh: bool = False):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or fresh:
+            if conn is not None:
+                conn.close()
+            conn_cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = self._local.conn = conn_cls(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def _post(self, path: str, model: str, prompt: str):
+        body = json.dumps({'model': model, 'prompt': prompt})
+        headers = {'Content-Type': 'application/json'}
+        try:
+            conn = self._connection()
+            conn.request('POST', path, body, headers)
+            resp = conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionError, http.client.ImproperConnectionState):
+            # an idle keep-alive connection was closed (or a stream left unread), retry on a new one
+            conn = self._connection(fresh=True)
+            conn.request('POST', path, body, headers)
+            resp = conn.getresponse()
+        if resp.status != 200:
+            detail = resp.read().decode(errors='replace')
+            raise RuntimeError(f"LLM backend returned {resp.status}: {detail}")
+        return resp
+
+    def generate(self, model: str, prompt: str) -> str:
+        return json.loads(self._post('/generate', model, prompt).read())['text']
+
+    def stream(self, model: str, prompt: str) -> Iterator[str]:
+        resp = self._post('/stream', model, prompt)
+        for line in resp:
+            if line.strip():
+                yield json.loads(line)['text']
+
+
+def _reply_chunks(prompt: str, reply: Optional[str], chunk_words: int):
+    reply = reply or f"Offline coach reply to a {len(prompt.split())}-word prompt. Keep tracking your spending and review your budgets each month."
+    words = reply.split(' ')
+    for i in range(0, len(words), chunk_words):
+        yield ' '.join(words[i:i + chunk_words]) + (' ' if i + chunk_words < len(words) else '')
+
+
+class FakeBackend:
+    """In-process stand-in: fixed text (or a short note about the prompt), token_delay apart."""
+
+    def __init__(self, reply: Optional[str] = None, token_delay: float = 0.0, chunk_words: int = 3):
+        self.reply = reply
+        self.token_delay = token_delay
+        self.chunk_words = chunk_words
+        self.calls = 0
+
+    def generate(self, model: str, prompt: str) -> str:
+        return ''.join(self.stream(model, prompt))
+
+    def stream(self, model: str, prompt: str) -> Iterator[str]:
+        self.calls += 1
+        for chunk in _reply_chunks(prompt, self.reply, self.chunk_words):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield chunk
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                load_dotenv()
+                kind = os.getenv("LLM_BACKEND", "gemini").lower()
+                if kind == "fake":
+                    _backend = FakeBackend()
+                elif kind == "http":
+                    _backend = HTTPBackend(os.getenv("LLM_URL", "http://127.0.0.1:8765"))
+                else:
+                    _backend = GeminiBackend()
+    return _backend
+
+def set_backend(backend):
+    """Use backend for every following call (None rebuilds it from the environment)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+class _StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        if self.path not in ('/generate', '/stream'):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        prompt = body.get('prompt', '')
+        server = self.server
+        time.sleep(max(0.0, random.gauss(server.latency, server.jitter)))
+
+        if self.path == '/generate':
+            payload = json.dumps({'text': ''.join(_reply_chunks(prompt, server.reply, 3))}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for i, chunk in enumerate(_reply_chunks(prompt, server.reply, 3)):
+            if i and server.token_delay:
+                time.sleep(server.token_delay)
+            line = (json.dumps({'text': chunk}) + '\n').encode()
+            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def standin_server(host: str = '127.0.0.1', port: int = 8765, latency: float = 0.5, jitter: float = 0.1,
+                   token_delay: float = 0.02, reply: Optional[str] = None) -> ThreadingHTTPServer:
+    """
+    Local HTTP server that answers HTTPBackend requests after latency seconds
+    (normally distributed with sd jitter), streaming pieces token_delay apart.
+    Call serve_forever() on it, or run it in a thread; port 0 picks a free port.
+    """
+    server = ThreadingHTTPServer((host, port), _StandinHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.jitter = jitter
+    server.token_delay = token_delay
+    server.reply = reply
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the local LLM stand-in server.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--token-delay', type=float, default=0.02)
+    args = parser.parse_args()
+    server = standin_server(args.host, args.port, args.latency, args.jitter, args.token_delay)
+    print(f"LLM stand-in listening on http://{args.host}:{server.server_address[1]}")
+    server.serve_forever()
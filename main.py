@@ -2,26 +2,41 @@ import streamlit as st
 import pandas as pd
 import json
 import os
-import plotly.express as px
-import pytesseract
-from PIL import Image
+import time
+from collections import deque
+from chatbox import response_stream, submit_analysis, response_cache
 from forecasting import frcst
-import plotly.graph_objects as go
+from nlp import extract_receipt, warm_up as warm_up_ner
+from ocr import submit_ocr
+from receipt_import import import_receipts, guess_categories, accepted_transactions
+from anomaly_detection import anomaly, StreamingAnomalyDetector, DetectorCheckpoint, debits_fingerprint
+from transaction_store import TransactionStore
+from aggregates import get_cube
+from budget_status import get_budget_matrix, VIEWS as BUDGET_VIEWS
+from duplicate_index import DuplicateIndex
+from csv_import import import_csv
+from compact import compact, plain, memory_report
+import columnar_store
+import perf
 
+st.set_page_config(page_title="AI Powered Personal Finance Coach", page_icon="💰", layout="wide")
 
-from chatbox import response, analysis
-from forecasting import frcst
-from forecasting import frcst, frcst_tot, frcstby_cat, _detect_trend, mt_frcst, _simple_average_forecast,get_budget_runway
-from nlp import extract_receipt
-from anomaly_detection import anomaly
+# MonthKey is for filtering and grouping, not for reading
+HIDDEN_COLUMNS = {"MonthKey": None}
 
-st.set_page_config(page_title="AI Powered Personal Finance Coach", page_icon="💰", layout="wide")
+# set NER_WARMUP=1 to load the receipt model when the server starts instead of on the first scan
+if os.getenv("NER_WARMUP", "").lower() in ("1", "true", "yes"):
+    warm_up_ner()
 
 category_file = "categories.json"
 account_file = "accounts.json"
 budget_file = "budgets.json"
+anomaly_state_file = "anomaly_state.json"
 default_dataset_path = "dataset/personal_transactions.csv"
+transactions_store_path = "data/transactions"
 default_budget_path = "dataset/Budget.csv"
+# reruns kept for the Performance panel and its trace export
+perf_history = 50
 
 def save_categories():
     with open(category_file, "w") as f:
@@ -35,6 +50,28 @@ def save_budgets():
     with open(budget_file, "w") as f:
         json.dump(st.session_state.budgets, f)
 
+@st.cache_resource
+def anomaly_checkpoint():
+    # one per server process, so the state file is written on a throttle across reruns and sessions
+    return DetectorCheckpoint(anomaly_state_file)
+
+def save_anomaly_state(new_debits):
+    # the fingerprint is extended with the new rows instead of rehashing the history
+    st.session_state.anomaly_fingerprint = debits_fingerprint(new_debits, st.session_state.anomaly_fingerprint)
+    anomaly_checkpoint().save(st.session_state.anomaly_detector, st.session_state.anomaly_fingerprint)
+
+def load_anomaly_detector(store):
+    # restore the saved sketches unless the history they were built from has changed
+    df = store.df
+    debits = df[df['Transaction Type'] == 'debit']
+    fingerprint = debits_fingerprint(debits)
+    st.session_state.anomaly_fingerprint = fingerprint
+    detector = anomaly_checkpoint().load(fingerprint)
+    if detector is None:
+        detector = StreamingAnomalyDetector().fit(debits)
+        anomaly_checkpoint().save(detector, fingerprint, force=True)
+    return detector
+
 if "categories" not in st.session_state:
     if os.path.exists(category_file):
         with open(category_file, "r") as f:
@@ -63,20 +100,79 @@ if "budgets" not in st.session_state:
 if "page" not in st.session_state:
     st.session_state.page = "main"
 
+def show_import_progress(bar):
+    def update(report):
+        bar.progress(report["progress"] or 0.0, text=f"Imported {report['rows']:,} transactions...")
+    return update
+
+def show_import_errors(report):
+    if report["error_count"]:
+        st.warning(f"Skipped {report['error_count']:,} invalid rows.")
+        with st.expander("Skipped rows"):
+            st.dataframe(pd.DataFrame(report["errors"]), hide_index=True)
+
+@perf.timed()
 def load_transactions(file):
+    # streamed in chunks, so a large export never sits in memory as raw text
     try:
-        df = pd.read_csv(file)
-
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                df[col] = df[col].str.strip()
-        df['Date'] = pd.to_datetime(df['Date'], format="%m/%d/%Y")
-        df.columns = [col.strip() for col in df.columns]
-        return df
+        bar = st.progress(0.0, text="Importing transactions...")
+        store = TransactionStore()
+        report = import_csv(file, store, on_progress=show_import_progress(bar))
+        bar.empty()
+        if report["error"]:
+            raise ValueError(report["error"])
+        show_import_errors(report)
+        return store.df
     except Exception as e:
         st.error(f"Error loading CSV file: {str(e)}")
         return None
 
+def csv_import_panel():
+    uploaded = st.file_uploader("Upload a bank export (CSV)", type=["csv"], key="csv_import_file")
+    st.caption("Columns: Date (MM/DD/YYYY), Description, Amount, Transaction Type (debit or credit), Category, Account Name. Transactions already recorded are skipped.")
+
+    report = st.session_state.pop("csv_import_report", None)
+    if report is not None:
+        st.success(f"Imported {report['rows']:,} transactions in {report['seconds']:.1f} s, skipped {report['duplicates']:,} already recorded.")
+        if report["repeats"]:
+            action = "skipped" if report["skip_repeats"] else "imported as separate transactions"
+            st.info(f"{report['repeats']:,} rows repeat an earlier row of the file and were {action}.")
+        if report["error"]:
+            st.error(f"Import stopped early: {report['error']}")
+        show_import_errors(report)
+
+    skip_repeats = st.checkbox("Skip rows that repeat an earlier row of the file",
+                               help="Identical rows in one export are usually separate purchases, so they are imported unless this is ticked.")
+    if uploaded is None or not st.button("Import CSV"):
+        return
+
+    def store_chunk(rows):
+        # every chunk is persisted and learned from as soon as it is in the store
+        columnar_store.append_transactions(rows, transactions_store_path)
+        if 'anomaly_detector' in st.session_state:
+            debits = rows[rows['Transaction Type'] == 'debit']
+            st.session_state.anomaly_detector.fit(debits)
+            save_anomaly_state(debits)
+
+    bar = st.progress(0.0, text="Importing transactions...")
+    report = import_csv(uploaded, st.session_state.store, st.session_state.duplicate_index,
+                        on_chunk=store_chunk, on_progress=show_import_progress(bar), skip_repeats=skip_repeats)
+    bar.empty()
+    report["skip_repeats"] = skip_repeats
+
+    df = st.session_state.store.df
+    for category in df['Category'].dropna().unique().tolist():
+        if category not in st.session_state.categories:
+            st.session_state.categories[category] = []
+    save_categories()
+    for account in df['Account Name'].dropna().unique().tolist():
+        if account not in st.session_state.accounts:
+            st.session_state.accounts.append(account)
+    save_accounts()
+
+    st.session_state.csv_import_report = report
+    st.rerun()
+
 def transaction_form(transaction_type, df, defaults=None, form_key_suffix=""):
     if defaults is None:
         defaults = {}
@@ -96,9 +192,7 @@ def transaction_form(transaction_type, df, defaults=None, form_key_suffix=""):
         
         amount = st.number_input("Amount", format="%.2f", min_value=0.0, value=defaults.get("amount", 0.0))
 
-        df_accounts = []
-        if 'Account Name' in df.columns:
-            df_accounts = df['Account Name'].dropna().unique().tolist()
+        df_accounts = account_names(st.session_state.store)
         
         all_accounts = sorted(list(set(df_accounts + st.session_state.accounts)))
         account_name = st.selectbox("Account Name", options=all_accounts)
@@ -108,6 +202,7 @@ def transaction_form(transaction_type, df, defaults=None, form_key_suffix=""):
             type_index = type_options.index(defaults.get("transaction_type", "debit"))
             transaction_type = st.selectbox("Transaction Type", options=type_options, index=type_index)
 
+        allow_duplicate = st.checkbox("Add even if it matches an existing transaction")
         submitted = st.form_submit_button(f"Add {transaction_type.capitalize()} Transaction")
 
         if submitted:
@@ -142,65 +237,347 @@ def transaction_form(transaction_type, df, defaults=None, form_key_suffix=""):
                     "Account Name": account_name
                 }
 
-                for col in df.columns:
-                    if col not in new_transaction:
-                        new_transaction[col] = None
-
-                new_transaction_df = pd.DataFrame([new_transaction])
-                st.session_state.df = pd.concat([st.session_state.df, new_transaction_df], ignore_index=True)
+                duplicate_index = st.session_state.get('duplicate_index')
+                if duplicate_index is not None and not allow_duplicate:
+                    if duplicate_index.contains(new_transaction):
+                        st.warning("This transaction is already recorded. Tick \"Add even if it matches an existing transaction\" to add it again.")
+                        return
+                    # a scanned receipt is often the same purchase as an imported bank line with a different description
+                    if form_key_suffix and duplicate_index.is_near_duplicate(new_transaction):
+                        st.warning("A transaction for the same amount on this account within a day is already recorded. Tick \"Add even if it matches an existing transaction\" to add it anyway.")
+                        return
+
+                new_row = pd.DataFrame([new_transaction])
+                st.session_state.store.append(new_transaction)
+                columnar_store.append_transactions(new_row, transactions_store_path)
+                if duplicate_index is not None:
+                    duplicate_index.add(new_transaction)
 
                 st.session_state.last_added_transaction = transaction_id
 
+                if transaction_type == 'debit' and 'anomaly_detector' in st.session_state:
+                    if st.session_state.anomaly_detector.observe(category, amount):
+                        st.session_state.flagged_transaction = f"{description} (${amount:,.2f}) is unusually high for {category}."
+                    save_anomaly_state(new_row)
+
                 st.success("Transaction added successfully!")
                 st.rerun()
             except Exception as e:
                 st.error(f"Error adding transaction: {str(e)}")
 
+def bulk_receipt_import(df):
+    uploads = st.file_uploader(
+        "Upload receipt images, text files or zip archives",
+        type=["png", "jpg", "jpeg", "txt", "zip"],
+        accept_multiple_files=True,
+        key="bulk_receipt_files"
+    )
+
+    df_accounts = df['Account Name'].dropna().unique().tolist() if 'Account Name' in df.columns else []
+    all_accounts = sorted(list(set(df_accounts + st.session_state.accounts)))
+    bulk_account = st.selectbox("Account for these receipts", options=all_accounts, key="bulk_account")
+
+    if uploads and st.button("Process Receipts"):
+        with st.spinner(f"Reading {len(uploads)} uploads..."):
+            result = import_receipts([(f.name, f.getvalue()) for f in uploads], default_account=bulk_account)
+            result["rows"] = guess_categories(result["rows"], df)
+            duplicate_index = st.session_state.get("duplicate_index")
+            if duplicate_index is not None and not result["rows"].empty:
+                # receipts already recorded (or near matches of them) start unticked; repeats
+                # within the batch are only marked, two identical receipts can be two purchases
+                rows = result["rows"]
+                duplicates = duplicate_index.batch()
+                recorded, repeated = duplicates.check(rows)
+                duplicate = recorded | (duplicate_index.near_duplicates(rows) & ~repeated)
+                rows.insert(1, "Duplicate", duplicate)
+                rows.insert(2, "Repeated", repeated)
+                rows["Include"] = rows["Include"] & ~duplicate
+        st.session_state.bulk_import = result
+
+    added = st.session_state.pop("bulk_import_added", None)
+    if added:
+        st.success(f"Added {added} transactions.")
+
+    result = st.session_state.get("bulk_import")
+    if result is None:
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Files", result["files"])
+    col2.metric("Parsed", len(result["rows"]))
+    col3.metric("Failed", len(result["failures"]))
+    col4.metric("Throughput", f"{result['files'] / max(result['seconds'], 1e-9):.1f} files/s")
+    st.caption(f"OCR {result['timings']['ocr']:.2f} s · extraction {result['timings']['extract']:.2f} s · total {result['seconds']:.2f} s")
+
+    if result["failures"]:
+        with st.expander(f"{len(result['failures'])} files could not be read"):
+            st.dataframe(pd.DataFrame(result["failures"]), hide_index=True)
+
+    if result["rows"].empty:
+        st.info("No receipts to review.")
+        return
+
+    st.subheader("Review Transactions")
+    reviewed = st.data_editor(
+        result["rows"],
+        column_config={
+            "Include": st.column_config.CheckboxColumn("Include"),
+            "Date": st.column_config.DateColumn("Date"),
+            "Category": st.column_config.SelectboxColumn("Category", options=list(st.session_state.categories.keys())),
+            "Amount": st.column_config.NumberColumn("Amount", min_value=0.0, format="$%.2f"),
+            "Transaction Type": st.column_config.SelectboxColumn("Transaction Type", options=["debit", "credit"]),
+            "Account Name": st.column_config.SelectboxColumn("Account Name", options=all_accounts),
+        },
+        disabled=["File", "Duplicate", "Repeated"],
+        hide_index=True,
+        key="bulk_review"
+    )
+
+    if st.button("Add Accepted Transactions"):
+        new_rows, problems = accepted_transactions(reviewed)
+        for problem in problems:
+            st.error(problem)
+        if not problems and not new_rows.empty:
+            # the whole batch goes into the store and onto disk in one append
+            st.session_state.store.extend(new_rows)
+            columnar_store.append_transactions(new_rows, transactions_store_path)
+            if 'duplicate_index' in st.session_state:
+                st.session_state.duplicate_index.add_many(new_rows)
+
+            if 'anomaly_detector' in st.session_state:
+                debits = new_rows[new_rows['Transaction Type'] == 'debit']
+                flagged = [description for description, category, amount
+                           in zip(debits['Description'], debits['Category'], debits['Amount'])
+                           if st.session_state.anomaly_detector.observe(category, amount)]
+                if flagged:
+                    st.session_state.flagged_transaction = f"Unusually high imported transactions: {', '.join(flagged[:3])}" + (f" and {len(flagged) - 3} more." if len(flagged) > 3 else ".")
+                save_anomaly_state(debits)
+
+            del st.session_state.bulk_import
+            st.session_state.bulk_import_added = len(new_rows)
+            st.rerun()
+
+def collect_analysis():
+    # move a finished background analysis into the session, returns True if one arrived
+    future = st.session_state.get("analysis_future")
+    if future is None or not future.done():
+        return False
+    del st.session_state.analysis_future
+    try:
+        st.session_state.financial_analysis = future.result()
+    except Exception as e:
+        st.session_state.financial_analysis = None
+        st.session_state.analysis_error = str(e)
+    return True
+
+def show_pending(future, message):
+    # polls from a fragment so the page stays usable meanwhile, and reruns the app once the future is done
+    @st.fragment(run_every=1)
+    def status():
+        if future.done():
+            st.rerun()
+        st.info(message)
+
+    status()
+
+def financial_analysis_panel():
+    collect_analysis()
+    pending = "analysis_future" in st.session_state
+
+    # only polls while the analysis is still being generated
+    @st.fragment(run_every=2 if pending else None)
+    def panel():
+        if collect_analysis():
+            st.rerun()
+        if st.session_state.get('financial_analysis'):
+            st.subheader("Your Financial Analysis")
+            st.markdown(st.session_state.financial_analysis)
+        elif "analysis_future" in st.session_state:
+            st.subheader("Your Financial Analysis")
+            st.info("Your AI coach is reviewing your finances. The analysis will appear here in a moment.")
+        elif st.session_state.get("analysis_error"):
+            st.error(f"Could not generate your financial analysis: {st.session_state.analysis_error}")
+
+    panel()
+
+# The tabs all run on every rerun, so what they compute is memoized on the store: built
+# once per version (and per widget value where one is an argument), then reused until the
+# next insert. Callers only read the results. Plotly is imported by the first chart built.
+
+def transactions_of_type(store, transaction_type):
+    return store.cached(("transactions", transaction_type), lambda df: df[df['Transaction Type'] == transaction_type])
+
+def account_names(store):
+    return store.cached("account_names", lambda df: df['Account Name'].dropna().unique().tolist() if 'Account Name' in df.columns else [])
+
+def category_names(store):
+    return store.cached("category_names", lambda df: df['Category'].dropna().unique().tolist())
+
+def month_names(store, transaction_type=None):
+    """Months with transactions (of transaction_type), newest first."""
+    where = {'Transaction Type': transaction_type} if transaction_type else None
+    return store.cached(("months", transaction_type), lambda df: [str(m) for m in sorted(get_cube(store).months(where=where), reverse=True)])
+
+def spending_anomalies(store):
+    return store.cached("anomalies", lambda df: anomaly(transactions_of_type(store, 'debit')))
+
+def spending_forecast(store):
+    return store.cached("forecast", lambda df: frcst(df, frcst_m=3, trsnctn_ty='debit', cube=get_cube(store)))
+
+def spending_over_time(store):
+    def build(df):
+        # excluding credit card payments
+        monthly = get_cube(store).monthly_series(where={'Transaction Type': 'debit'}, exclude={'Category': 'Credit Card Payment'})
+        if not monthly.empty:
+            monthly.index = monthly.index.to_timestamp(how='end').normalize()
+        return monthly
+    return store.cached("spending_over_time", build)
+
+def category_spending_chart(store):
+    def build(df):
+        import plotly.express as px
+        category_spending = get_cube(store).rollup('Category', where={'Transaction Type': 'debit'})['sum'].rename('Amount').reset_index()
+        return px.pie(category_spending, 
+                      values='Amount', 
+                      names='Category', 
+                      title='Spending Distribution Across Categories',
+                      hole=.3)
+    return store.cached("category_spending_chart", build)
+
+def forecast_chart(store):
+    def build(df):
+        import plotly.graph_objects as go
+        forecast_data = spending_forecast(store)
+        forecast_df = pd.DataFrame({
+            'Month': forecast_data['total_forecast']['dates'],
+            'Forecasted': forecast_data['total_forecast']['amounts'],
+            'Lower Bound': forecast_data['total_forecast']['lower_bound'],
+            'Upper Bound': forecast_data['total_forecast']['upper_bound']
+        })
+
+        fig = go.Figure()
+
+        fig.add_trace(go.Scatter(
+            x=forecast_df['Month'], y=forecast_df['Upper Bound'],
+            fill=None, mode='lines', line_color='rgba(200,200,200,0.2)',
+            showlegend=False
+        ))
+
+        fig.add_trace(go.Scatter(
+            x=forecast_df['Month'], y=forecast_df['Lower Bound'],
+            fill='tonexty', mode='lines', line_color='rgba(200,200,200,0.2)',
+            name='Confidence Interval', fillcolor='rgba(200,200,200,0.3)'
+        ))
+
+        fig.add_trace(go.Scatter(
+            x=forecast_df['Month'], y=forecast_df['Forecasted'],
+            mode='lines+markers', name='Forecasted Spending',
+            line=dict(color='rgb(31, 119, 180)', width=3), marker=dict(size=10)
+        ))
+
+        fig.update_layout(title='Predicted Spending', xaxis_title='Month', 
+                          yaxis_title='Amount ($)', hovermode='x unified', height=400)
+        return fig
+    return store.cached("forecast_chart", build)
+
+def category_view(store, category, month):
+    """The category's transactions in month ('All Months' for every month), its debits, and their monthly or daily totals."""
+    def build(df):
+        category_df = df[df['Category'] == category]
+        if month != 'All Months':
+            category_df = category_df[category_df['MonthKey'] == pd.Period(month, freq='M').ordinal]
+        category_debits = category_df[category_df['Transaction Type'] == 'debit']
+
+        if month == 'All Months':
+            totals = get_cube(store).rollup('YearMonth', where={'Category': category, 'Transaction Type': 'debit'}).reset_index()
+            totals.columns = ['Month', 'Total Spent', 'Transactions', 'Avg per Transaction']
+            totals['Month'] = totals['Month'].astype(str)
+        else:
+            totals = category_debits.groupby(category_debits['Date'].dt.date)['Amount'].sum().reset_index()
+            totals.columns = ['Date', 'Amount']
+        return category_df, category_debits, totals
+    return store.cached(("category_view", category, month), build)
+
+def account_view(store, account):
+    """The account's transactions, its debit and credit totals, and its spending pie (None without debits)."""
+    def build(df):
+        cube = get_cube(store)
+        account_df = df[df['Account Name'] == account]
+        account_totals = cube.rollup('Transaction Type', where={'Account Name': account})['sum']
+        account_spending = cube.rollup('Category', where={'Account Name': account, 'Transaction Type': 'debit'})['sum']
+        chart = None
+        if not account_spending.empty:
+            import plotly.express as px
+            chart = px.pie(account_spending.rename('Amount').reset_index(), 
+                           values='Amount', 
+                           names='Category', 
+                           title=f'Spending Breakdown for {account}',
+                           hole=.3)
+        return account_df, account_totals, chart
+    return store.cached(("account_view", account), build)
+
 def main():
     st.title("AI Powered Personal Finance Coach")
 
-    if 'df' not in st.session_state:
-        if os.path.exists(default_dataset_path):
-            st.session_state.df = load_transactions(default_dataset_path)
-            if st.session_state.df is not None:
-                if 'Category' in st.session_state.df.columns:
-                    csv_categories = st.session_state.df['Category'].dropna().unique().tolist()
-                    for category in csv_categories:
-                        if category not in st.session_state.categories:
-                            st.session_state.categories[category] = []
-                    save_categories()
-
-                if 'Account Name' in st.session_state.df.columns:
-                    csv_accounts = st.session_state.df['Account Name'].dropna().unique().tolist()
-                    for account in csv_accounts:
-                        if account not in st.session_state.accounts:
-                            st.session_state.accounts.append(account)
-                    save_accounts()
-        else:
-            st.session_state.df = None
+    if 'store' not in st.session_state:
+        st.session_state.store = None
+        loaded_df = None
+        if columnar_store.has_transactions(transactions_store_path):
+            loaded_df = columnar_store.load_transactions(transactions_store_path)
+        elif os.path.exists(default_dataset_path):
+            # first run: import the CSV once, later sessions load the columnar copy
+            loaded_df = load_transactions(default_dataset_path)
+            if loaded_df is not None:
+                columnar_store.save_transactions(loaded_df, transactions_store_path)
+        if loaded_df is not None:
+            # categoricals and an integer month key take a fraction of the memory of plain strings
+            loaded_df = compact(loaded_df)
+            st.session_state.store = TransactionStore(loaded_df)
+            st.session_state.duplicate_index = DuplicateIndex(loaded_df)
+            if 'Category' in loaded_df.columns:
+                csv_categories = loaded_df['Category'].dropna().unique().tolist()
+                for category in csv_categories:
+                    if category not in st.session_state.categories:
+                        st.session_state.categories[category] = []
+                save_categories()
+
+            if 'Account Name' in loaded_df.columns:
+                csv_accounts = loaded_df['Account Name'].dropna().unique().tolist()
+                for account in csv_accounts:
+                    if account not in st.session_state.accounts:
+                        st.session_state.accounts.append(account)
+                save_accounts()
+
+    # the store hands out one consolidated frame per version, rebuilt only after inserts
+    df = st.session_state.store.df if st.session_state.store is not None else None
+    # totals and breakdowns all come from one rollup, also rebuilt only after inserts
+    cube = get_cube(st.session_state.store) if df is not None else None
+
+    if df is not None and "anomaly_detector" not in st.session_state:
+        if 'Transaction Type' in df.columns:
+            st.session_state.anomaly_detector = load_anomaly_detector(st.session_state.store)
 
-    if st.session_state.get("df") is not None and "financial_analysis" not in st.session_state:
-        df_copy = st.session_state.df.copy()
-        st.session_state.financial_analysis = analysis(df_copy)
+    flagged_transaction = st.session_state.pop("flagged_transaction", None)
+    if flagged_transaction:
+        st.toast(flagged_transaction, icon="⚠️")
 
-    if st.session_state.df is not None:
-        df = st.session_state.df
+    if df is not None and "financial_analysis" not in st.session_state and "analysis_future" not in st.session_state:
+        # generated on a worker thread; the AI Insights tab shows it once it arrives
+        df_copy = df.copy()
+        st.session_state.analysis_future = submit_analysis(df_copy, st.session_state.budgets, cube=cube)
 
+    if df is not None:
         if 'Transaction Type' in df.columns:
-            debits_df = df[df['Transaction Type'] == 'debit'].copy()
-            credits_df = df[df['Transaction Type'] == 'credit'].copy()
+            store = st.session_state.store
+            debits_df = transactions_of_type(store, 'debit')
 
             tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8= st.tabs(["Dashboard", "Debit Transactions", "Credit Transactions", "Categories", "Budget", "Account", "AI Insights", "Receipt Scanner"])
 
-            with tab1:
+            with tab1, perf.span("tab.dashboard"):
                 st.header("Financial Dashboard")
 
-                total_income = credits_df[credits_df['Category'] == 'Paycheck']['Amount'].sum()
-
-                debits_df = df[df['Transaction Type'] == 'debit'].copy()
-                credits_df = df[df['Transaction Type'] == 'credit'].copy()
-
-                total_expense = debits_df[debits_df['Category'] != 'Credit Card Payment']['Amount'].sum()
+                total_income = cube.total(where={'Transaction Type': 'credit', 'Category': 'Paycheck'})
+                total_expense = cube.total(where={'Transaction Type': 'debit'}, exclude={'Category': 'Credit Card Payment'})
                 net_savings = total_income - total_expense
 
                 col1, col2, col3, col4 = st.columns(4)
@@ -218,25 +595,17 @@ def main():
                 with col1:
                     st.subheader("Spending by Category")
                     if not debits_df.empty:
-                        category_spending = debits_df.groupby('Category')['Amount'].sum().reset_index()
-                        fig_cat_spending = px.pie(category_spending, 
-                                                  values='Amount', 
-                                                  names='Category', 
-                                                  title='Spending Distribution Across Categories',
-                                                  hole=.3)
-                        st.plotly_chart(fig_cat_spending, width= "stretch")
+                        with perf.span("plot.category_pie"):
+                            st.plotly_chart(category_spending_chart(store), width= "stretch")
                     else:
                         st.info("No debit transactions to display.")
 
                 with col2:
                     st.subheader("Spending Over Time")
                     if not debits_df.empty:
-                        # excluding credit card payments
-                        debits_for_chart = debits_df[debits_df['Category'] != 'Credit Card Payment'].copy()
-                        if not debits_for_chart.empty:
-                            debits_df_sorted = debits_for_chart.sort_values('Date')
-                            spending_over_time = debits_df_sorted.set_index('Date').resample('ME')['Amount'].sum()
-                            st.line_chart(spending_over_time)
+                        spending_trend = spending_over_time(store)
+                        if not spending_trend.empty:
+                            st.line_chart(spending_trend.rename('Amount'))
                         else:
                             st.info("No spending transactions to display.")
                     else:
@@ -245,7 +614,7 @@ def main():
                 st.divider()
 
                 st.subheader("Spending Anomaly Detection")
-                anomalous_spending = anomaly(debits_df)
+                anomalous_spending = spending_anomalies(store)
 
                 if not anomalous_spending.empty:
                     st.warning("We've detected some unusually high spending. Use the filter below to narrow down by category.")
@@ -273,7 +642,7 @@ def main():
     
                 if not debits_df.empty:
                 
-                    forecast_data = frcst(df, frcst_m=3, trsnctn_ty='debit')
+                    forecast_data = spending_forecast(store)
                     
                     # will be the metrix on the tp
                     col1, col2, col3 = st.columns(3)
@@ -295,57 +664,26 @@ def main():
                     # the chart given for the forecast
                     st.markdown("#### 📈 3-Month Spending Forecast")
                     
-                    forecast_df = pd.DataFrame({
-                        'Month': forecast_data['total_forecast']['dates'],
-                        'Forecasted': forecast_data['total_forecast']['amounts'],
-                        'Lower Bound': forecast_data['total_forecast']['lower_bound'],
-                        'Upper Bound': forecast_data['total_forecast']['upper_bound']
-                    })
-                    
-                    fig = go.Figure()
-                    
-                    fig.add_trace(go.Scatter(
-                        x=forecast_df['Month'], y=forecast_df['Upper Bound'],
-                        fill=None, mode='lines', line_color='rgba(200,200,200,0.2)',
-                        showlegend=False
-                    ))
-                    
-                    fig.add_trace(go.Scatter(
-                        x=forecast_df['Month'], y=forecast_df['Lower Bound'],
-                        fill='tonexty', mode='lines', line_color='rgba(200,200,200,0.2)',
-                        name='Confidence Interval', fillcolor='rgba(200,200,200,0.3)'
-                    ))
-                    
-                    fig.add_trace(go.Scatter(
-                        x=forecast_df['Month'], y=forecast_df['Forecasted'],
-                        mode='lines+markers', name='Forecasted Spending',
-                        line=dict(color='rgb(31, 119, 180)', width=3), marker=dict(size=10)
-                    ))
-                    
-                    fig.update_layout(title='Predicted Spending', xaxis_title='Month', 
-                                    yaxis_title='Amount ($)', hovermode='x unified', height=400)
-                    
-                    st.plotly_chart(fig, use_container_width=True)
+                    with perf.span("plot.forecast"):
+                        st.plotly_chart(forecast_chart(store), use_container_width=True)
             
                 else:
                     st.info("Not enough data for forecasting. Add more transactions!")
 
 
-            with tab2:
+            with tab2, perf.span("tab.debits"):
                 st.header("Debit Transactions")
-                debits_df = df[df['Transaction Type'] == 'debit'].copy()
-                st.dataframe(debits_df)
+                st.dataframe(debits_df, column_config=HIDDEN_COLUMNS)
                 st.divider()
                 transaction_form('debit', df)
 
-            with tab3:
+            with tab3, perf.span("tab.credits"):
                 st.header("Credit Transactions")
-                credits_df = df[df['Transaction Type'] == 'credit'].copy()
-                st.dataframe(credits_df)
+                st.dataframe(transactions_of_type(store, 'credit'), column_config=HIDDEN_COLUMNS)
                 st.divider()
                 transaction_form('credit', df)
 
-            with tab4:
+            with tab4, perf.span("tab.categories"):
                 st.header("Manage and View Categories")
 
                 with st.expander("Add New Category"):
@@ -363,22 +701,16 @@ def main():
                     col_cat, col_month = st.columns([2, 1])
 
                     with col_cat:
-                        category_options = df['Category'].dropna().unique().tolist()
+                        category_options = category_names(store)
                         selected_category = st.selectbox("Select a category", options=category_options)
 
                     with col_month:
                         # Get all unique months from the dataset
-                        df['YearMonth'] = df['Date'].dt.to_period('M')
-                        all_months = sorted(df['YearMonth'].unique(), reverse=True)
-                        month_options = ['All Months'] + [str(m) for m in all_months]
+                        month_options = ['All Months'] + month_names(store)
                         selected_month = st.selectbox("Select a month", options=month_options)
 
                     if selected_category:
-                        category_df = df[df['Category'] == selected_category].copy()
-
-                        # Filter by selected month if not "All Months"
-                        if selected_month != 'All Months':
-                            category_df = category_df[category_df['YearMonth'] == selected_month]
+                        category_df, category_debits, category_totals = category_view(store, selected_category, selected_month)
 
                         # Monthly spending analysis
                         st.divider()
@@ -387,25 +719,18 @@ def main():
                         else:
                             st.subheader(f"Spending for {selected_category} in {selected_month}")
 
-                        # Filter for debit transactions only
-                        category_debits = category_df[category_df['Transaction Type'] == 'debit'].copy()
-
                         if not category_debits.empty:
                             if selected_month == 'All Months':
-                                # Add Year-Month column
-                                category_debits['YearMonth'] = category_debits['Date'].dt.to_period('M')
-
-                                # Calculate monthly totals
-                                monthly_spending = category_debits.groupby('YearMonth')['Amount'].agg(['sum', 'count', 'mean']).reset_index()
-                                monthly_spending.columns = ['Month', 'Total Spent', 'Transactions', 'Avg per Transaction']
-                                monthly_spending['Month'] = monthly_spending['Month'].astype(str)
+                                monthly_spending = category_totals
 
                                 # Display metrics
+                                category_total = monthly_spending['Total Spent'].sum()
+                                category_count = monthly_spending['Transactions'].sum()
                                 col1, col2, col3, col4 = st.columns(4)
-                                col1.metric("Total Spent", f"${category_debits['Amount'].sum():,.2f}")
+                                col1.metric("Total Spent", f"${category_total:,.2f}")
                                 col2.metric("Avg Monthly", f"${monthly_spending['Total Spent'].mean():,.2f}")
                                 col3.metric("Total Transactions", f"{len(category_debits)}")
-                                col4.metric("Avg per Transaction", f"${category_debits['Amount'].mean():,.2f}")
+                                col4.metric("Avg per Transaction", f"${category_total / category_count:,.2f}")
 
                                 # Monthly spending table
                                 st.markdown("#### Monthly Breakdown")
@@ -416,8 +741,7 @@ def main():
 
                                 # Monthly spending chart
                                 st.markdown("#### Spending Trend")
-                                monthly_chart_data = category_debits.groupby('YearMonth')['Amount'].sum().reset_index()
-                                monthly_chart_data['YearMonth'] = monthly_chart_data['YearMonth'].astype(str)
+                                monthly_chart_data = monthly_spending[['Month', 'Total Spent']].rename(columns={'Month': 'YearMonth', 'Total Spent': 'Amount'})
                                 monthly_chart_data = monthly_chart_data.set_index('YearMonth')
                                 st.line_chart(monthly_chart_data)
                             else:
@@ -429,9 +753,7 @@ def main():
 
                                 # Show spending distribution for the month
                                 st.markdown("#### Daily Spending")
-                                daily_spending = category_debits.groupby(category_debits['Date'].dt.date)['Amount'].sum().reset_index()
-                                daily_spending.columns = ['Date', 'Amount']
-                                st.bar_chart(daily_spending.set_index('Date'))
+                                st.bar_chart(category_totals.set_index('Date'))
                         else:
                             if selected_month == 'All Months':
                                 st.info(f"No debit transactions found for {selected_category}")
@@ -446,13 +768,13 @@ def main():
                             st.subheader(f"Transactions in {selected_month}")
 
                         if not category_df.empty:
-                            st.dataframe(category_df)
+                            st.dataframe(category_df, column_config=HIDDEN_COLUMNS)
                         else:
                             st.info(f"No transactions found for {selected_category} in {selected_month}")
                 else:
                     st.warning("No 'Category' column found in the dataframe.")
             
-            with tab5:
+            with tab5, perf.span("tab.budget"):
                 st.header("Set Your Budget")
 
                 with st.form("budget_form"):
@@ -468,40 +790,34 @@ def main():
                 st.divider()
 
                 # Month selector for budget view
-                col_header, col_month_select = st.columns([2, 1])
+                col_header, col_month_select, col_view_select = st.columns([2, 1, 1])
                 with col_header:
                     st.subheader("Current Budgets")
                 with col_month_select:
                     # Get all unique months from debits
                     if not debits_df.empty:
-                        debits_df['YearMonth'] = debits_df['Date'].dt.to_period('M')
-                        budget_months = sorted(debits_df['YearMonth'].unique(), reverse=True)
-                        budget_month_options = [str(m) for m in budget_months]
+                        budget_month_options = month_names(store, 'debit')
                         # Default to most recent month
                         selected_budget_month = st.selectbox("View Period", options=budget_month_options, index=0, key="budget_month_select")
                     else:
                         selected_budget_month = None
+                with col_view_select:
+                    budget_view = st.selectbox("Range", options=list(BUDGET_VIEWS), format_func=BUDGET_VIEWS.get, key="budget_view_select",
+                                               help="Quarter and year to date compare the spending so far with the monthly budgets times the months elapsed.")
 
                 if st.session_state.budgets:
-                    budget_df = pd.DataFrame(list(st.session_state.budgets.items()), columns=['Category', 'Budget'])
-
-                    # Filter spending by selected month
-                    if selected_budget_month and not debits_df.empty:
-                        filtered_debits = debits_df[debits_df['YearMonth'] == selected_budget_month]
-                    else:
-                        filtered_debits = debits_df.copy()
-
-                    spending_df = filtered_debits.groupby('Category')['Amount'].sum().reset_index().rename(columns={'Amount': 'Spent'})
-
-                    budget_status_df = pd.merge(budget_df, spending_df, on='Category', how='left').fillna(0)
-                    budget_status_df['Remaining'] = budget_status_df['Budget'] - budget_status_df['Spent']
+                    # every month and range is a lookup in the matrix built once per data version
+                    budget_status_df = get_budget_matrix(store).status(st.session_state.budgets, selected_budget_month, budget_view)
 
                     # Summary metrics
                     total_budget = budget_status_df['Budget'].sum()
                     total_spent = budget_status_df['Spent'].sum()
                     total_remaining = total_budget - total_spent
 
-                    st.markdown(f"### Summary for {selected_budget_month}")
+                    if budget_view == "month" or selected_budget_month is None:
+                        st.markdown(f"### Summary for {selected_budget_month}")
+                    else:
+                        st.markdown(f"### Summary for {BUDGET_VIEWS[budget_view]} through {selected_budget_month}")
                     col1, col2, col3, col4 = st.columns(4)
                     col1.metric("Total Budget", f"${total_budget:,.2f}")
                     col2.metric("Total Spent", f"${total_spent:,.2f}")
@@ -511,39 +827,41 @@ def main():
                     st.divider()
 
                     # Individual category budgets
-                    for category, budget in st.session_state.budgets.items():
+                    for row in budget_status_df.itertuples(index=False):
+                        category, budget, spent = row.Category, row.Budget, row.Spent
                         st.write(f"**{category}**")
-                        category_row = budget_status_df[budget_status_df['Category'] == category]
-
-                        if not category_row.empty:
-                            spent = category_row['Spent'].iloc[0]
-                            remaining = budget - spent
-                        else:
-                            spent = 0
-                            remaining = budget
 
                         col1, col2, col3 = st.columns(3)
                         col1.metric("Budget", f"${budget:,.2f}")
                         col2.metric("Spent", f"${spent:,.2f}")
-                        col3.metric("Remaining", f"${remaining:,.2f}")
+                        col3.metric("Remaining", f"${row.Remaining:,.2f}")
 
-                        progress = min(spent / budget, 1.0) if budget > 0 else 0
+                        progress = min(row.Usage, 1.0) if budget > 0 else 0
                         st.progress(progress)
 
-                        if spent > budget:
+                        if row.Status == "over":
                             st.error(f"You are ${spent - budget:,.2f} over your budget for {category}!")
-                        elif spent > budget * 0.9:
-                            st.warning(f"You've used {(spent/budget*100):.1f}% of your budget for {category}")
+                        elif row.Status == "warning":
+                            st.warning(f"You've used {row.Usage * 100:.1f}% of your budget for {category}")
                         else:
-                            st.success(f"On track! {(spent/budget*100):.1f}% used")
+                            st.success(f"On track! {row.Usage * 100:.1f}% used")
 
                         st.divider()
                 else:
                     st.info("No budgets set yet.")
             
-            with tab6:
+            with tab6, perf.span("tab.accounts"):
                 st.header("Manage Accounts")
 
+                with st.expander("Import Bank Export"):
+                    csv_import_panel()
+
+                with st.expander("Memory Usage"):
+                    if st.button("Measure Memory Usage"):
+                        report = memory_report(plain(df), df)
+                        st.caption(f"{len(df):,} transactions: {report.loc['total', 'After']:,.0f} bytes per row, {report.loc['total', 'Before']:,.0f} as plain strings.")
+                        st.dataframe(report.style.format("{:,.1f}"), column_config={"_index": "Column", "Before": "Bytes/row as strings", "After": "Bytes/row compact"})
+
                 with st.expander("Add New Account"):
                     new_account = st.text_input("New Account Name", key="new_account_name_input")
                     add_account_button = st.button("Add Account")
@@ -557,9 +875,7 @@ def main():
                         else:
                             st.warning(f"Account '{new_account}' already exists.")
 
-                df_accounts = []
-                if 'Account Name' in df.columns:
-                    df_accounts = df['Account Name'].dropna().unique().tolist()
+                df_accounts = account_names(store)
                 
                 all_accounts = sorted(list(set(df_accounts + st.session_state.accounts)))
 
@@ -570,42 +886,37 @@ def main():
                     selected_account_for_view = st.selectbox("Select an account to view transactions", options=all_accounts, key="view_account_select")
 
                     if selected_account_for_view:
-                        account_df = df[df['Account Name'] == selected_account_for_view]
+                        account_df, account_totals, fig_account_spending = account_view(store, selected_account_for_view)
                         
                         if not account_df.empty:
-                            account_debits = account_df[account_df['Transaction Type'] == 'debit']['Amount'].sum()
-                            account_credits = account_df[account_df['Transaction Type'] == 'credit']['Amount'].sum()
+                            account_debits = account_totals.get('debit', 0.0)
+                            account_credits = account_totals.get('credit', 0.0)
                             
                             col1, col2 = st.columns(2)
                             col1.metric(f"Total Spending from {selected_account_for_view}", f"${account_debits:,.2f}")
                             col2.metric(f"Total Deposits to {selected_account_for_view}", f"${account_credits:,.2f}")
 
-                            st.dataframe(account_df)
+                            st.dataframe(account_df, column_config=HIDDEN_COLUMNS)
 
-                            account_debits_df = account_df[account_df['Transaction Type'] == 'debit']
-                            if not account_debits_df.empty:
+                            if fig_account_spending is not None:
                                 st.subheader(f"Spending Categories for {selected_account_for_view}")
-                                fig_account_spending = px.pie(account_debits_df, 
-                                                              values='Amount', 
-                                                              names='Category', 
-                                                              title=f'Spending Breakdown for {selected_account_for_view}',
-                                                              hole=.3)
-                                st.plotly_chart(fig_account_spending, width= "stretch")
+                                with perf.span("plot.account_pie"):
+                                    st.plotly_chart(fig_account_spending, width= "stretch")
                         else:
                             st.info(f"No transactions found for account '{selected_account_for_view}'.")
                 else:
                     st.info("No accounts available to view.")
 
-                with tab7:
+                with tab7, perf.span("tab.insights"):
                     st.header("AI-Powered Insights")
 
-                    if st.session_state.get('financial_analysis'):
-                        st.subheader("Your Financial Analysis")
-                        st.markdown(st.session_state.financial_analysis)
-                    
+                    financial_analysis_panel()
+
                     st.divider()
 
                     st.subheader("Chat with your AI Financial Coach")
+                    cache_stats = response_cache.stats()
+                    st.caption(f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['entries']} saved answers")
 
                     if "messages" not in st.session_state:
                         st.session_state.messages = []
@@ -620,23 +931,29 @@ def main():
                             st.markdown(prompt)
 
                         with st.chat_message("assistant"):
-                            with st.spinner("Thinking..."):
-                                ai_response = response(st.session_state.df, st.session_state.budgets, prompt)
-                                st.markdown(ai_response)
+                            # rendered as it streams in instead of after the whole answer
+                            ai_response = st.write_stream(response_stream(st.session_state.store.df, st.session_state.budgets, prompt, cube=get_cube(st.session_state.store), store=st.session_state.store))
 
                         st.session_state.messages.append({"role": "assistant", "content": ai_response})
 
-            with tab8:
+            with tab8, perf.span("tab.receipts"):
                 st.header("Receipt Scanner")
+                scan_mode = st.radio("Mode", ["Single Receipt", "Bulk Import"], horizontal=True, key="receipt_mode")
 
-                uploaded_file = st.file_uploader(
-                    "Upload Receipt Image or Text File",
-                    type=["png", "jpg", "jpeg", "txt"]
-                )
+                if scan_mode == "Bulk Import":
+                    bulk_receipt_import(df)
+                    uploaded_file = None
+                else:
+                    uploaded_file = st.file_uploader(
+                        "Upload Receipt Image or Text File",
+                        type=["png", "jpg", "jpeg", "txt"]
+                    )
 
                 if uploaded_file is not None:
                     file_type = uploaded_file.type
                     st.write(f"File type detected: {file_type}")
+                    stage_timings = {}
+                    ocr_cached = False
 
                     if file_type == "text/plain":
                         try:
@@ -647,9 +964,19 @@ def main():
 
                     elif "image" in file_type:
                         try:
-                            image = Image.open(uploaded_file)
-                            st.image(image, caption="Uploaded Receipt", width= 'stretch')
-                            text = pytesseract.image_to_string(image)
+                            image_bytes = uploaded_file.getvalue()
+                            st.image(image_bytes, caption="Uploaded Receipt", width= 'stretch')
+                            # preprocessed and read in the OCR worker pool, cached by file hash across
+                            # reruns; each rerun asks again and shares the running job until it is done
+                            ocr_job = submit_ocr(image_bytes)
+                            if ocr_job.done():
+                                ocr_result = ocr_job.result()
+                                text = ocr_result["text"]
+                                stage_timings.update(ocr_result["timings"])
+                                ocr_cached = ocr_result["cached"]
+                            else:
+                                show_pending(ocr_job, "Reading receipt...")
+                                text = None
                         except Exception as e:
                             st.error(f"Error reading image file: {str(e)}")
                             text = None
@@ -662,7 +989,17 @@ def main():
                             st.text(text)
 
                         try:
-                            result = extract_receipt(text)
+                            # the form below reruns the tab on every input, so keep the details of the last receipt
+                            extracted = st.session_state.get("receipt_extraction")
+                            if extracted is not None and extracted[0] == text:
+                                result = extracted[1]
+                            else:
+                                start = time.perf_counter()
+                                result = extract_receipt(text)
+                                stage_timings["extract"] = time.perf_counter() - start
+                                st.session_state.receipt_extraction = (text, result)
+                            st.caption(" · ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in stage_timings.items())
+                                       + (" (OCR result from cache)" if ocr_cached else ""))
                             st.subheader("Extracted Receipt Details")
                             st.json(result)
                             
@@ -699,7 +1036,48 @@ def main():
 
         else:
             st.warning("The CSV file must contain a 'Transaction Type' column with 'debit' and 'credit' values.")
-            st.dataframe(df)
+            st.dataframe(df, column_config=HIDDEN_COLUMNS)
+
+def performance_panel(trace):
+    # only rendered while spans are being recorded (PERF=1, or a session opened with ?perf=1)
+    runs = st.session_state.setdefault("perf_runs", deque(maxlen=perf_history))
+    runs.append(trace)
+    span_columns = {
+        "name": "Span", "calls": "Calls", "total_ms": st.column_config.NumberColumn("Total ms", format="%.1f"),
+        "mean_ms": st.column_config.NumberColumn("Mean ms", format="%.2f"), "max_ms": st.column_config.NumberColumn("Max ms", format="%.1f"),
+        "memory_delta": st.column_config.NumberColumn("Memory MiB", format="%+.1f", help="Change in resident memory (Linux only)"),
+    }
+
+    def span_table(t):
+        summary = pd.DataFrame(t.summary(), columns=list(span_columns))
+        summary["memory_delta"] = pd.to_numeric(summary["memory_delta"]) / 2**20
+        st.dataframe(summary, hide_index=True, column_config=span_columns)
+
+    with st.expander("Performance"):
+        st.caption(f"Last rerun took {trace.seconds * 1000:,.0f} ms over {len(trace.spans)} spans. Open the app with ?perf=0 to stop recording this session.")
+        span_table(trace)
+        if trace.counters:
+            st.dataframe(pd.Series(trace.counters, name="Count"), column_config={"_index": "Counter"})
+        st.line_chart(pd.Series([t.seconds * 1000 for t in runs], name="Rerun ms"))
+
+        background = perf.background_trace()
+        if background.spans:
+            st.markdown("**Background work** (analysis and other worker threads, since the server started)")
+            span_table(background)
+
+        st.download_button("Export Trace (JSON)", data=json.dumps(perf.chrome_trace(list(runs) + [background])),
+                           file_name="perf_trace.json", mime="application/json",
+                           help="Chrome trace format, opens in ui.perfetto.dev or chrome://tracing")
 
 if __name__ == "__main__":
-    main()
+    # ?perf=1 records this session only; PERF=1 records every session
+    if st.query_params.get("perf") in ("0", "1"):
+        st.session_state.perf = st.query_params["perf"] == "1"
+    perf.begin_run(record=st.session_state.get("perf", False))
+    try:
+        main()
+    finally:
+        show_perf = perf.enabled()
+        trace = perf.end_run()
+    if show_perf:
+        performance_panel(trace)
@@ -1,14 +1,50 @@
-from transformers import pipeline
 import re
+import threading
 from datetime import datetime
+import perf
 
+NER_MODEL = "dbmdz/distilbert-base-cased-finetuned-conll03-english"
+
+# the NER model takes seconds to load, so it is built once per process and shared
+_ner_pipeline = None
+_ner_error = None
+_ner_lock = threading.Lock()
+
+def get_ner_pipeline():
+    global _ner_pipeline, _ner_error
+    if _ner_pipeline is None:
+        with _ner_lock:
+            if _ner_pipeline is None:
+                if _ner_error is not None:
+                    raise _ner_error
+                try:
+                    # transformers (and torch under it) takes seconds to import, so only the first receipt pays for it
+                    from transformers import pipeline
+                    _ner_pipeline = pipeline(
+                        "ner",
+                        model=NER_MODEL,
+                        aggregation_strategy="simple"
+                    )
+                except Exception as e:
+                    # remember the failure so every receipt doesn't retry the load
+                    _ner_error = e
+                    raise
+    return _ner_pipeline
+
+def warm_up():
+    """Load the NER model ahead of the first receipt. Returns False if it is unavailable."""
+    if _ner_pipeline is not None:
+        return True
+    try:
+        get_ner_pipeline()("Warm up")
+        return True
+    except Exception:
+        return False
+
+@perf.timed()
 def extract_receipt(text: str):
     try:
-        ner_pipeline = pipeline(
-            "ner",
-            model="dbmdz/distilbert-base-cased-finetuned-conll03-english",
-            aggregation_strategy="simple"
-        )
+        ner_pipeline = get_ner_pipeline()
         
         entities = ner_pipeline(text)
         
@@ -19,136 +55,190 @@ def extract_receipt(text: str):
     except Exception as e:
         return rule_based_extraction(text)
 
+@perf.timed()
+def extract_receipts(texts, batch_size: int = 16):
+    """Run many receipt texts through the NER model in batches."""
+    texts = list(texts)
+    if not texts:
+        return []
+    try:
+        ner_pipeline = get_ner_pipeline()
+        all_entities = ner_pipeline(texts, batch_size=batch_size)
+    except Exception:
+        return [rule_based_extraction(text) for text in texts]
+    
+    return [process_entities(entities, text) for entities, text in zip(all_entities, texts)]
+
 def process_entities(entities, original_text):
+    rules = parse_receipt_rules(original_text)
     extracted_data = {
         "merchant": "",
         "amount": "",
         "date": "",
-        "transaction_type": classify_transaction_type(original_text),
-        "payment_method": classify_payment_method(original_text)
+        "transaction_type": rules["transaction_type"],
+        "payment_method": rules["payment_method"]
     }
     
     for entity in entities:
         if entity['entity_group'] == 'ORG':
             extracted_data["merchant"] += entity['word'] + " "
         elif entity['entity_group'] == 'MISC' and any(char.isdigit() for char in entity['word']):
-            if '$' in entity['word'] or re.search(r'\d+\.\d{2}', entity['word']):
+            if '$' in entity['word'] or _DECIMAL_RE.search(entity['word']):
                 extracted_data["amount"] = entity['word']
     
     extracted_data["merchant"] = extracted_data["merchant"].strip()
     
     if not extracted_data["amount"]:
-        extracted_data["amount"] = extract_amount_rule_based(original_text)
+        extracted_data["amount"] = rules["amount"]
     if not extracted_data["date"]:
-        extracted_data["date"] = extract_date_rule_based(original_text)
+        extracted_data["date"] = rules["date"]
     if not extracted_data["merchant"]:
-        extracted_data["merchant"] = extract_merchant_rule_based(original_text)
+        extracted_data["merchant"] = rules["merchant"]
     
     return extracted_data
 
 def rule_based_extraction(text: str):
+    return parse_receipt_rules(text)
+
+# patterns shared by the rule-based extractors, compiled once at import
+_URL_RE = re.compile(r'([a-zA-Z0-9]+)\.com', re.IGNORECASE)
+_ADDRESS_RE = re.compile(r'[A-Za-z\s]+,\s*[A-Z]{2}\s*\d{5}')
+_ADDRESS_HINT_RE = re.compile(r',\s*[A-Z]{2}\s*\d{5}')
+_LEADING_DIGIT_RE = re.compile(r'^\d')
+_NUMERIC_LINE_RE = re.compile(r'^[\d\s\.\$\%]+$')
+_MERCHANT_SKIP_RE = re.compile(r'receipt|transaction|sale|copy|thank|date|time|total|tax|payment|card|customer')
+_MERCHANT_SKIP_WORDS = ('receipt', 'transaction', 'sale', 'copy', 'thank you', 'customer', 'date', 'time')
+_AMOUNT_RE = re.compile(r'[\$]?\s*(\d+\.\d{2})')
+_DECIMAL_RE = re.compile(r'\d+\.\d{2}')
+_DATE_RES = [
+    re.compile(r'(\d{1,2}/\d{1,2}/\d{2,4})', re.IGNORECASE),
+    re.compile(r'(\d{1,2}-\d{1,2}-\d{2,4})', re.IGNORECASE),
+    re.compile(r'(\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})', re.IGNORECASE),
+]
+_DATE_HINTS = [('/',), ('-',), ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec')]
+
+def _keywords_re(keywords):
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+
+_CREDIT_RE = _keywords_re(['refund', 'return', 'credit', 'deposit', 'payment received'])
+_PAYMENT_METHOD_RES = [
+    (_keywords_re(['visa', 'mastercard', 'amex', 'american express', 'discover', 'credit card']), "credit card"),
+    (_keywords_re(['debit card', 'check card', 'bank card']), "debit card"),
+    (_keywords_re(['cash', 'currency']), "cash"),
+    (_keywords_re(['check', 'cheque']), "check"),
+]
+
+def parse_receipt_rules(text: str):
+    """
+    Rule-based extraction of merchant, amount, date, type and payment method.
+
+    The text is split and case-folded once and shared by every rule, so this gives
+    the same answers as the per-field functions below without rescanning the receipt.
+    """
+    raw_lines = text.split('\n')
+    text_lower = text.lower()
     return {
-        "merchant": extract_merchant_rule_based(text),
-        "amount": extract_amount_rule_based(text),
-        "date": extract_date_rule_based(text),
-        "transaction_type": classify_transaction_type(text),
-        "payment_method": classify_payment_method(text)
+        "merchant": _merchant(text, text_lower, raw_lines),
+        "amount": _amount(text, raw_lines),
+        "date": _date(text, text_lower),
+        "transaction_type": _transaction_type(text_lower),
+        "payment_method": _payment_method(text_lower)
     }
 
 def extract_merchant_rule_based(text: str):
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
-    
-    url_match = re.search(r'([a-zA-Z0-9]+)\.com', text, re.IGNORECASE)
+    return _merchant(text, text.lower(), text.split('\n'))
+
+def _merchant(text: str, text_lower: str, raw_lines):
+    url_match = _URL_RE.search(text) if '.com' in text_lower else None
     if url_match:
         domain = url_match.group(1)
         return domain.title()
     
-    for i, line in enumerate(lines):
-        if re.search(r'[A-Za-z\s]+,\s*[A-Z]{2}\s*\d{5}', line):
-            for j in range(1, min(3, i+1)):
-                candidate = lines[i-j]
-                if is_valid_merchant_candidate(candidate):
-                    return candidate
+    lines = [line for line in map(str.strip, raw_lines) if line]
+    
+    # cheap whole-text check before testing every line for a "City, ST 12345" address
+    if _ADDRESS_HINT_RE.search(text):
+        for i, line in enumerate(lines):
+            if _ADDRESS_RE.search(line):
+                for j in range(1, min(3, i+1)):
+                    candidate = lines[i-j]
+                    if is_valid_merchant_candidate(candidate):
+                        return candidate
     
-    skip_words = ['receipt', 'transaction', 'sale', 'copy', 'thank you', 'customer', 'date', 'time']
     for line in lines[:8]:
-        line_lower = line.lower()
-        if (len(line) > 3 and 
-            not any(word in line_lower for word in skip_words) and
-            not re.match(r'^\d', line) and
-            not re.match(r'^[\d\s\.\$\%]+$', line)):
+        if _is_header_merchant(line):
             return line
     
     return "Unknown Merchant"
 
+def _is_header_merchant(line: str):
+    line_lower = line.lower()
+    return (len(line) > 3 and 
+            not any(word in line_lower for word in _MERCHANT_SKIP_WORDS) and
+            not _LEADING_DIGIT_RE.match(line) and
+            not _NUMERIC_LINE_RE.match(line))
+
 def is_valid_merchant_candidate(text: str):
     """Check if text could be a valid merchant name"""
     if len(text) < 2 or len(text) > 100:
         return False
     
-    skip_patterns = [
-        r'^\d',
-        r'^[\d\s\.\$\%]+$',
-        r'receipt|transaction|sale|copy|thank|date|time|total|tax|payment|card|customer',
-    ]
-    
     text_lower = text.lower()
-    for pattern in skip_patterns:
-        if re.search(pattern, text_lower):
-            return False
+    if (_LEADING_DIGIT_RE.search(text_lower) or
+            _NUMERIC_LINE_RE.search(text_lower) or
+            _MERCHANT_SKIP_RE.search(text_lower)):
+        return False
     
     return True
 
 def extract_amount_rule_based(text: str):
-    lines = text.split('\n')
-    for i, line in enumerate(lines):
-        if 'TOTAL' in line.upper():
-            amount_match = re.search(r'[\$]?\s*(\d+\.\d{2})', line)
-            if amount_match:
-                return amount_match.group(1)
-            if i + 1 < len(lines):
-                amount_match = re.search(r'[\$]?\s*(\d+\.\d{2})', lines[i + 1])
+    return _amount(text, text.split('\n'))
+
+def _amount(text: str, raw_lines):
+    upper_text = text.upper()
+    if 'TOTAL' in upper_text:
+        # any TOTAL PURCHASE line is also a TOTAL line, so one scan covers both
+        for i, line in enumerate(upper_text.split('\n')):
+            if 'TOTAL' in line:
+                amount_match = _AMOUNT_RE.search(raw_lines[i])
                 if amount_match:
                     return amount_match.group(1)
-    for line in lines:
-        if 'TOTAL PURCHASE' in line.upper():
-            amount_match = re.search(r'[\$]?\s*(\d+\.\d{2})', line)
-            if amount_match:
-                return amount_match.group(1)
-    all_amounts = re.findall(r'[\$]?\s*(\d+\.\d{2})', text)
+                if i + 1 < len(raw_lines):
+                    amount_match = _AMOUNT_RE.search(raw_lines[i + 1])
+                    if amount_match:
+                        return amount_match.group(1)
+    all_amounts = _AMOUNT_RE.findall(text)
     if all_amounts:
         amounts_float = [float(amt) for amt in all_amounts]
         return f"{max(amounts_float):.2f}"
     return None
 
 def extract_date_rule_based(text: str):
-    date_patterns = [
-        r'(\d{1,2}/\d{1,2}/\d{2,4})',
-        r'(\d{1,2}-\d{1,2}-\d{2,4})',
-        r'(\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})',
-    ]
-    for pattern in date_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    return _date(text, text.lower())
+
+def _date(text: str, text_lower: str):
+    # each pattern needs a separator or month name, so skip the regex when it can't match
+    for pattern, hint in zip(_DATE_RES, _DATE_HINTS):
+        if not any(h in text_lower for h in hint):
+            continue
+        match = pattern.search(text)
         if match:
             return match.group(1)
     return datetime.now().strftime("%m/%d/%Y")
 
 def classify_transaction_type(text: str):
-    text_lower = text.lower()
-    credit_indicators = ['refund', 'return', 'credit', 'deposit', 'payment received']
-    if any(keyword in text_lower for keyword in credit_indicators):
+    return _transaction_type(text.lower())
+
+def _transaction_type(text_lower: str):
+    if _CREDIT_RE.search(text_lower):
         return "credit"
     return "debit"
 
 def classify_payment_method(text: str):
-    text_lower = text.lower()
-    if any(keyword in text_lower for keyword in ['visa', 'mastercard', 'amex', 'american express', 'discover', 'credit card']):
-        return "credit card"
-    elif any(keyword in text_lower for keyword in ['debit card', 'check card', 'bank card']):
-        return "debit card"
-    elif any(keyword in text_lower for keyword in ['cash', 'currency']):
-        return "cash"
-    elif any(keyword in text_lower for keyword in ['check', 'cheque']):
-        return "check"
-    else:
-        return "unknown"
+    return _payment_method(text.lower())
+
+def _payment_method(text_lower: str):
+    for pattern, method in _PAYMENT_METHOD_RES:
+        if pattern.search(text_lower):
+            return method
+    return "unknown"
@@ -0,0 +1,143 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import perf
+
+'''
+OCR stage of the receipt scanner.
+Uploads are preprocessed before tesseract sees them: scaled down to the target DPI
+(phone photos are often 3-4x more pixels than OCR needs), converted to grayscale and
+binarized with an Otsu threshold. The work runs in a small process pool, results are
+cached by the SHA-256 of the file so an image is never read twice, and every stage
+is timed. PIL and pytesseract are imported by the first scan, not with the app.
+'''
+
+TARGET_DPI = 300
+# longest side used when the file has no DPI, about a 7 inch receipt at 300 DPI
+MAX_SIDE = 2100
+CACHE_SIZE = 128
+# bulk imports queue many images at once, so use the cores (a few are plenty for tesseract)
+WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Gray level that best separates ink from paper (maximum between-class variance)."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(float)
+    levels = np.arange(256)
+    weight = np.cumsum(hist)
+    mean = np.cumsum(hist * levels)
+    total, total_mean = weight[-1], mean[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (total_mean * weight - mean * total) ** 2 / (weight * (total - weight))
+    return int(np.nanargmax(between)) if np.isfinite(between).any() else 127
+
+def preprocess(image: 'Image.Image', target_dpi: int = TARGET_DPI, max_side: int = MAX_SIDE) -> 'Image.Image':
+    from PIL import Image, ImageOps
+    image = ImageOps.exif_transpose(image)
+    scale = 1.0
+    dpi = image.info.get('dpi', (0, 0))[0]
+    if dpi and dpi > target_dpi:
+        scale = target_dpi / dpi
+    longest = max(image.size) * scale
+    if longest > max_side:
+        scale *= max_side / longest
+
+    gray = image.convert('L')
+    if scale < 1.0:
+        size = (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+        gray = gray.resize(size, Image.LANCZOS)
+
+    threshold = otsu_threshold(np.asarray(gray))
+    return gray.point(lambda p: 255 if p > threshold else 0)
+
+def _ocr_bytes(data: bytes, target_dpi: int, max_side: int):
+    # runs in a worker process: decode, preprocess and recognize one upload
+    import pytesseract
+    from PIL import Image
+    timings = {}
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    timings['decode'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    prepared = preprocess(image, target_dpi, max_side)
+    timings['preprocess'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        text = pytesseract.image_to_string(prepared, config=f'--dpi {target_dpi}')
+    except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError) as e:
+        # pytesseract's errors can't be pickled back to the app process
+        raise RuntimeError(str(e)) from None
+    timings['ocr'] = time.perf_counter() - start
+    return text, timings
+
+
+_pool = None
+_lock = threading.Lock()
+_cache = OrderedDict()
+_in_flight = {}
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the app process runs threads, which fork does not copy safely
+        _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+def _finish(key: str, future: Future):
+    global _pool
+    with _lock:
+        _in_flight.pop(key, None)
+        if isinstance(future.exception(), BrokenProcessPool):
+            # a worker died; start a fresh pool for the next upload instead of failing forever
+            _pool = None
+        elif future.exception() is None:
+            _cache[key] = future.result()
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+
+def submit_ocr(data: bytes, target_dpi: int = TARGET_DPI, max_side: int = MAX_SIDE) -> Future:
+    """
+    OCR an image file's bytes in the worker pool. The Future resolves to a dict with
+    'text', 'timings' (seconds per stage), 'cached' and 'hash'. A cached image resolves
+    at once and an image already being read shares the running job.
+    """
+    start = time.perf_counter()
+    key = f'{hashlib.sha256(data).hexdigest()}:{target_dpi}:{max_side}'
+    hash_time = time.perf_counter() - start
+
+    result = Future()
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+        job = _in_flight.get(key)
+        new_job = cached is None and job is None
+        if new_job:
+            job = _in_flight[key] = _get_pool().submit(_ocr_bytes, data, target_dpi, max_side)
+
+    if cached is not None:
+        perf.count('ocr.cache_hits')
+        result.set_result({'text': cached[0], 'timings': {'hash': hash_time}, 'cached': True, 'hash': key})
+        return result
+
+    def resolve(done: Future):
+        if done.exception() is not None:
+            result.set_exception(done.exception())
+            return
+        text, timings = done.result()
+        result.set_result({'text': text, 'timings': {'hash': hash_time, **timings}, 'cached': False, 'hash': key})
+
+    if new_job:
+        perf.count('ocr.jobs')
+        job.add_done_callback(lambda done: _finish(key, done))
+    job.add_done_callback(resolve)
+    return result
@@ -0,0 +1,219 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+'''
+Timing spans and counters for the app's hot paths.
+
+    with perf.span('tab.dashboard'):
+        ...
+
+    @perf.timed()
+    def frcst(...): ...
+
+    perf.count('llm.cache_hit')
+
+Everything is off unless PERF=1 is set for the whole process, or a rerun is started with
+begin_run(record=True) (the app does this for sessions opened with ?perf=1), which records
+on that thread only. While off, a span is one flag check that hands back a shared
+do-nothing context manager and a timed function is one flag check before the real call,
+so the instrumentation can stay in place.
+
+While on, every span records its wall time, the change in the process's resident memory
+(read from /proc, so None on macOS and Windows) and its nesting under the span that was
+open around it. Spans and counters go to the Trace of the current rerun (begin_run/end_run,
+one per thread); work on threads without a rerun, such as the background analysis, goes
+to a shared background trace.
+'''
+
+_enabled = os.getenv('PERF', '').lower() in ('1', 'true', 'yes')
+_local = threading.local()
+_PAGE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+BACKGROUND_SPANS = 2000
+
+def enabled() -> bool:
+    """Whether spans are recorded on this thread, process-wide or for the current rerun."""
+    return _enabled or getattr(_local, 'record', False)
+
+def set_enabled(on: bool):
+    """Turn recording on or off for the whole process."""
+    global _enabled
+    _enabled = bool(on)
+
+def _rss() -> Optional[int]:
+    """Current resident set size in bytes, or None where /proc is not available (macOS, Windows)."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _memory_delta(before: Optional[int], after: Optional[int]) -> Optional[int]:
+    return None if before is None or after is None else after - before
+
+
+class Trace:
+    """The spans and counters of one rerun."""
+
+    def __init__(self, label: str = 'rerun', max_spans: Optional[int] = None):
+        self.label = label
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+        self.seconds = None
+        self.spans = deque(maxlen=max_spans)
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add(self, span: Dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def count(self, name: str, n: float):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self) -> List[Dict]:
+        """Per span name: calls, total, mean and max milliseconds, memory change in bytes (None if unavailable)."""
+        rows = {}
+        for s in list(self.spans):
+            row = rows.setdefault(s['name'], {'name': s['name'], 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'memory_delta': 0})
+            row['calls'] += 1
+            row['total_ms'] += s['ms']
+            row['max_ms'] = max(row['max_ms'], s['ms'])
+            if row['memory_delta'] is not None and s['memory_delta'] is not None:
+                row['memory_delta'] += s['memory_delta']
+            else:
+                row['memory_delta'] = None
+        for row in rows.values():
+            row['mean_ms'] = row['total_ms'] / row['calls']
+        return sorted(rows.values(), key=lambda r: r['total_ms'], reverse=True)
+
+    def to_dict(self) -> Dict:
+        return {'label': self.label, 'wall_start': self.wall_start, 'seconds': self.seconds,
+                'spans': list(self.spans), 'counters': dict(self.counters)}
+
+
+_background = Trace('background', max_spans=BACKGROUND_SPANS)
+
+def _trace() -> Trace:
+    return getattr(_local, 'trace', None) or _background
+
+def background_trace() -> Trace:
+    return _background
+
+def begin_run(label: str = 'rerun', record: bool = False) -> Trace:
+    """Start collecting this thread's spans into a new Trace; record=True turns recording on until end_run."""
+    trace = Trace(label)
+    _local.trace = trace
+    _local.depth = 0
+    _local.record = record
+    return trace
+
+def end_run() -> Optional[Trace]:
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.seconds = time.perf_counter() - trace.start
+        _local.trace = None
+    _local.record = False
+    return trace
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'trace', 'start', 'rss', 'depth')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.trace = _trace()
+        self.depth = getattr(_local, 'depth', 0)
+        _local.depth = self.depth + 1
+        self.rss = _rss()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _local.depth = self.depth
+        self.trace.add({
+            'name': self.name,
+            'start_ms': (self.start - self.trace.start) * 1000,
+            'ms': (end - self.start) * 1000,
+            'memory_delta': _memory_delta(self.rss, _rss()),
+            'depth': self.depth,
+            'thread': threading.current_thread().name,
+            'error': exc_type.__name__ if exc_type else None,
+        })
+        return False
+
+
+def span(name: str):
+    """Context manager timing the block as name."""
+    if not enabled():
+        return _NULL_SPAN
+    return _Span(name)
+
+def count(name: str, n: float = 1):
+    if enabled():
+        _trace().count(name, n)
+
+def timed(name: Optional[str] = None):
+    """Decorator: every call is a span (module.function unless name is given); generators are timed until exhausted."""
+    def decorate(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                if not enabled():
+                    return fn(*args, **kwargs)
+                return _timed_generator(label, fn(*args, **kwargs))
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return fn(*args, **kwargs)
+            with _Span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def _timed_generator(label: str, gen):
+    with _Span(label):
+        yield from gen
+
+
+def chrome_trace(traces: List[Trace]) -> Dict:
+    """Traces in the Chrome trace event format (chrome://tracing, ui.perfetto.dev)."""
+    events = []
+    for pid, trace in enumerate(traces, 1):
+        events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': f"{trace.label} {pid}"}})
+        for s in list(trace.spans):
+            events.append({'name': s['name'], 'ph': 'X', 'pid': pid, 'tid': s['thread'],
+                           'ts': s['start_ms'] * 1000, 'dur': s['ms'] * 1000,
+                           'args': {'memory_delta': s['memory_delta'], 'error': s['error']}})
+        if trace.counters:
+            events.append({'name': 'counters', 'ph': 'C', 'pid': pid, 'ts': 0, 'args': dict(trace.counters)})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'runs': [t.to_dict() for t in traces]}}
+
+def export(traces: List[Trace], path: str):
+    with open(path, 'w') as f:
+        json.dump(chrome_trace(traces), f)
@@ -0,0 +1,150 @@
+import math
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+import perf
+from aggregates import AggregateCube, get_cube
+from anomaly_detection import anomaly
+from forecasting import frcst
+from response_cache import budgets_key
+
+'''
+Builds the financial summary the AI coach is prompted with.
+Instead of the raw transactions, the prompt gets a few short sections (overview,
+monthly totals, top categories, budget variance, forecast trends and anomalies),
+each capped at a fixed number of lines and trimmed to a token budget, so its
+size stays the same however long the history gets.
+'''
+
+DEFAULT_TOKEN_BUDGET = 600
+MAX_MONTHS = 12
+MAX_CATEGORIES = 8
+MAX_BUDGETS = 8
+MAX_ANOMALIES = 5
+
+def estimate_tokens(text: str) -> int:
+    # rough count, about 4 characters per token for English text and numbers
+    return math.ceil(len(text) / 4)
+
+def _money(x: float) -> str:
+    return f"${x:,.2f}"
+
+def _overview(financial_data: pd.DataFrame, cube: AggregateCube) -> List[str]:
+    by_type = cube.rollup('Transaction Type')['sum']
+    income = by_type.get('credit', 0.0)
+    expense = by_type.get('debit', 0.0)
+    months = cube.months()
+    lines = [
+        f"Total Income: {_money(income)}",
+        f"Total Expenses: {_money(expense)}",
+        f"Net Savings: {_money(income - expense)}",
+        f"Transactions: {len(financial_data)}",
+    ]
+    if months:
+        lines.append(f"Period: {months[0]} to {months[-1]} ({len(months)} months)")
+    return lines
+
+def _monthly_totals(cube: AggregateCube) -> List[str]:
+    monthly = cube.rollup(['YearMonth', 'Transaction Type'])['sum'].unstack(fill_value=0.0)
+    lines = []
+    for month, row in monthly.iloc[-MAX_MONTHS:][::-1].iterrows():
+        lines.append(f"{month}: income {_money(row.get('credit', 0.0))}, spending {_money(row.get('debit', 0.0))}")
+    return lines
+
+def _top_categories(cube: AggregateCube) -> List[str]:
+    spending = cube.rollup('Category', where={'Transaction Type': 'debit'})['sum'].sort_values(ascending=False)
+    total = spending.sum()
+    return [f"{category}: {_money(amount)} ({amount / total * 100:.1f}%)"
+            for category, amount in spending.iloc[:MAX_CATEGORIES].items()] if total > 0 else []
+
+def _budget_variance(cube: AggregateCube, budgets: Optional[Dict]) -> Tuple[str, List[str]]:
+    months = cube.months(where={'Transaction Type': 'debit'})
+    if not budgets or not months:
+        return '', []
+    month = months[-1]
+    spent = cube.rollup('Category', where={'Transaction Type': 'debit', 'YearMonth': month})['sum']
+    rows = []
+    for category, budget in budgets.items():
+        amount = float(spent.get(category, 0.0))
+        rows.append((amount - budget, category, amount, budget))
+    # the most overspent categories first
+    rows.sort(key=lambda r: r[0], reverse=True)
+    lines = []
+    for over, category, amount, budget in rows[:MAX_BUDGETS]:
+        status = f"over by {_money(over)}" if over >= 0.005 else f"{_money(abs(over))} left"
+        lines.append(f"{category}: spent {_money(amount)} of {_money(budget)} ({status})")
+    return str(month), lines
+
+def _forecast_trends(financial_data: pd.DataFrame, cube: AggregateCube) -> List[str]:
+    forecast = frcst(financial_data, frcst_m=3, trsnctn_ty='debit', cube=cube)
+    amounts = forecast['total_forecast']['amounts']
+    if not forecast['total_forecast']['dates']:
+        return []
+    lines = [
+        f"Spending trend: {forecast['trend']}",
+        f"Next month forecast: {_money(amounts[0])}, 3-month average {_money(forecast['total_forecast']['average'])}",
+    ]
+    by_category = forecast.get('forecast_category', {})
+    largest = sorted(by_category.items(), key=lambda kv: kv[1]['forecasted_amounts'][0], reverse=True)
+    for category, values in largest[:MAX_CATEGORIES // 2]:
+        lines.append(f"{category}: next month {_money(values['forecasted_amounts'][0])} (average {_money(values['historical_average'])})")
+    return lines
+
+def _anomalies(financial_data: pd.DataFrame) -> List[str]:
+    debits = financial_data[financial_data['Transaction Type'] == 'debit']
+    flagged = anomaly(debits)
+    if flagged.empty:
+        return []
+    flagged = flagged.nlargest(MAX_ANOMALIES, 'Amount')
+    return [f"{pd.Timestamp(row['Date']).date()} {row['Description']} ({row['Category']}): {_money(row['Amount'])}"
+            for _, row in flagged.iterrows()]
+
+def _fit(sections: List[Tuple[str, List[str]]], token_budget: int) -> str:
+    # whole sections in priority order, then as many of each one's lines as still fit
+    out = []
+    used = 0
+    for title, lines in sections:
+        if not lines:
+            continue
+        header = f"{title}:"
+        cost = estimate_tokens(header) + estimate_tokens(lines[0]) + 2
+        if used + cost > token_budget:
+            continue
+        out.append(header)
+        used += estimate_tokens(header) + 1
+        for line in lines:
+            line = f"- {line}"
+            line_cost = estimate_tokens(line) + 1
+            if used + line_cost > token_budget:
+                break
+            out.append(line)
+            used += line_cost
+    return '\n'.join(out)
+
+@perf.timed()
+def build_summary(financial_data: pd.DataFrame, budgets: Optional[Dict] = None,
+                  cube: Optional[AggregateCube] = None, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """
+    Compact text summary of the transactions for a prompt, at most about token_budget
+    tokens. Sections are kept in priority order: overview, monthly totals, top
+    categories, budget variance, forecast trends, anomalies.
+    """
+    if financial_data.empty or 'Transaction Type' not in financial_data.columns:
+        return "No transactions recorded yet."
+    if cube is None:
+        cube = AggregateCube(financial_data)
+
+    budget_month, budget_lines = _budget_variance(cube, budgets)
+    sections = [
+        ("Overview", _overview(financial_data, cube)),
+        (f"Monthly totals (latest {MAX_MONTHS} months)", _monthly_totals(cube)),
+        ("Top spending categories", _top_categories(cube)),
+        (f"Budgets for {budget_month}", budget_lines),
+        ("Forecast", _forecast_trends(financial_data, cube)),
+        ("Unusually large purchases", _anomalies(financial_data)),
+    ]
+    return _fit(sections, token_budget)
+
+def get_summary(store, budgets: Optional[Dict] = None, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """build_summary of the store's current data, built at most once per store version and budgets."""
+    return store.cached(('prompt_summary', budgets_key(budgets), token_budget),
+                        lambda df: build_summary(df, budgets, get_cube(store), token_budget))
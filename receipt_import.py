@@ -0,0 +1,133 @@
+import io
+import os
+import time
+import zipfile
+from typing import Dict, List, Tuple
+import pandas as pd
+from nlp import extract_receipts
+from ocr import submit_ocr
+
+'''
+Bulk receipt import: many images and text files (or zip archives of them) in one pass.
+Every image is queued on the OCR worker pool at once so they are read in parallel, then
+all the texts go through the NER model in batches, and the results come back as one
+table of candidate transactions to review before they are added.
+'''
+
+IMAGE_TYPES = ('.png', '.jpg', '.jpeg')
+TEXT_TYPES = ('.txt',)
+REVIEW_COLUMNS = ['Include', 'File', 'Date', 'Description', 'Category', 'Amount', 'Transaction Type', 'Account Name']
+
+def expand_uploads(uploads: List[Tuple[str, bytes]]) -> Tuple[List[Tuple[str, bytes]], List[Dict]]:
+    """(name, bytes) pairs with zip archives unpacked; unsupported files are returned as failures."""
+    files, failures = [], []
+    for name, data in uploads:
+        ext = os.path.splitext(name)[1].lower()
+        if ext == '.zip':
+            try:
+                with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                    for info in archive.infolist():
+                        member = info.filename
+                        if info.is_dir() or member.startswith('__MACOSX/') or os.path.basename(member).startswith('.'):
+                            continue
+                        if os.path.splitext(member)[1].lower() in IMAGE_TYPES + TEXT_TYPES:
+                            files.append((f"{name}/{member}", archive.read(info)))
+                        else:
+                            failures.append({'file': f"{name}/{member}", 'error': 'unsupported file type'})
+            except zipfile.BadZipFile as e:
+                failures.append({'file': name, 'error': f"bad zip archive: {e}"})
+        elif ext in IMAGE_TYPES + TEXT_TYPES:
+            files.append((name, data))
+        else:
+            failures.append({'file': name, 'error': 'unsupported file type'})
+    return files, failures
+
+def _parse_amount(value) -> float:
+    try:
+        return float(str(value).replace('$', '').replace(',', '').strip())
+    except ValueError:
+        return float('nan')
+
+def import_receipts(uploads: List[Tuple[str, bytes]], batch_size: int = 16, default_account: str = None) -> Dict:
+    """
+    OCR and parse every upload. Returns 'rows' (a review table with an Include column),
+    'failures' (file and error), 'files', 'seconds' and per-stage 'timings'.
+    """
+    start = time.perf_counter()
+    files, failures = expand_uploads(uploads)
+
+    # queue every image before waiting on any, so the pool works on all of them at once
+    ocr_start = time.perf_counter()
+    jobs = [(name, submit_ocr(data) if name.lower().endswith(IMAGE_TYPES) else data) for name, data in files]
+    names, texts = [], []
+    for name, job in jobs:
+        try:
+            text = job.decode('utf-8') if isinstance(job, bytes) else job.result()['text']
+        except Exception as e:
+            failures.append({'file': name, 'error': str(e)})
+            continue
+        if not text.strip():
+            failures.append({'file': name, 'error': 'no text found'})
+            continue
+        names.append(name)
+        texts.append(text)
+    ocr_time = time.perf_counter() - ocr_start
+
+    extract_start = time.perf_counter()
+    receipts = extract_receipts(texts, batch_size=batch_size)
+    extract_time = time.perf_counter() - extract_start
+
+    rows = pd.DataFrame({
+        'Include': True,
+        'File': names,
+        'Date': pd.to_datetime(pd.Series([r.get('date') or None for r in receipts], dtype=object), errors='coerce', format='mixed'),
+        'Description': [r.get('merchant') or '' for r in receipts],
+        'Category': pd.Series([None] * len(receipts), dtype=object),
+        'Amount': [_parse_amount(r.get('amount')) for r in receipts],
+        'Transaction Type': [r.get('transaction_type') or 'debit' for r in receipts],
+        'Account Name': default_account,
+    }, columns=REVIEW_COLUMNS)
+    # rows the parser could not fill in completely start unticked
+    rows['Include'] = rows['Date'].notna() & (rows['Amount'] > 0) & (rows['Description'] != '')
+
+    return {
+        'rows': rows,
+        'failures': failures,
+        'files': len(files),
+        'seconds': time.perf_counter() - start,
+        'timings': {'ocr': ocr_time, 'extract': extract_time},
+    }
+
+def guess_categories(rows: pd.DataFrame, history: pd.DataFrame) -> pd.DataFrame:
+    """Fill Category from the category most often used for the same description before."""
+    if rows.empty or history.empty or 'Category' not in history.columns or 'Description' not in history.columns:
+        return rows
+    known = history.dropna(subset=['Category', 'Description'])
+    counts = known.groupby([known['Description'].astype(str).str.lower(), known['Category'].astype(str)]).size().reset_index()
+    counts.columns = ['description', 'category', 'n']
+    best = counts.sort_values('n', ascending=False, kind='stable').drop_duplicates('description')
+    lookup = dict(zip(best['description'], best['category']))
+    guesses = rows['Description'].astype(str).str.lower().map(lookup)
+    rows['Category'] = rows['Category'].where(rows['Category'].notna(), guesses)
+    return rows
+
+def accepted_transactions(reviewed: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+    """The ticked rows of a review table as store rows, plus a problem per unusable ticked row."""
+    ticked = reviewed[reviewed['Include'].fillna(False).astype(bool)]
+    problems = []
+    keep = []
+    for i, row in ticked.iterrows():
+        missing = [col for col in ('Date', 'Description', 'Category', 'Account Name')
+                   if pd.isna(row[col]) or row[col] == '']
+        if missing:
+            problems.append(f"{row['File']}: missing {', '.join(missing)}")
+        elif not row['Amount'] > 0:
+            problems.append(f"{row['File']}: amount must be greater than 0")
+        elif row['Transaction Type'] not in ('debit', 'credit'):
+            problems.append(f"{row['File']}: transaction type must be debit or credit")
+        else:
+            keep.append(i)
+    rows = ticked.loc[keep, ['Date', 'Description', 'Category', 'Amount', 'Transaction Type', 'Account Name']].copy()
+    rows['Date'] = pd.to_datetime(rows['Date'])
+    rows['Amount'] = rows['Amount'].astype(float)
+    return rows.reset_index(drop=True), problems
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+import pandas as pd
+
+'''
+Disk-backed cache for model responses.
+Entries are keyed on the model, the normalized prompt and a fingerprint of the data
+the prompt was built from, so a changed transaction or budget is a different key.
+Old entries expire after ttl seconds and the least recently used ones are dropped
+once there are more than max_entries.
+'''
+
+def normalize_prompt(prompt: str) -> str:
+    return re.sub(r'\s+', ' ', prompt).strip().lower()
+
+def budgets_key(budgets: Optional[dict]) -> str:
+    return json.dumps(budgets or {}, sort_keys=True, default=str)
+
+def data_fingerprint(financial_data: pd.DataFrame, budgets: Optional[dict] = None) -> str:
+    """Content hash of the transactions and budgets."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(map(str, financial_data.columns))).encode())
+    digest.update(pd.util.hash_pandas_object(financial_data, index=False).to_numpy().tobytes())
+    digest.update(budgets_key(budgets).encode())
+    return digest.hexdigest()
+
+def get_fingerprint(store, budgets: Optional[dict] = None) -> str:
+    """data_fingerprint of the store's current data, hashed at most once per store version and budgets."""
+    return store.cached(('data_fingerprint', budgets_key(budgets)), lambda df: data_fingerprint(df, budgets))
+
+class ResponseCache:
+    def __init__(self, path: str, ttl: float = 24 * 3600, max_entries: int = 256):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    for key, entry in json.load(f).items():
+                        self._entries[key] = entry
+            except (OSError, ValueError):
+                self._entries = OrderedDict()
+
+    @staticmethod
+    def key(model: str, prompt: str, fingerprint: str = '') -> str:
+        return hashlib.sha256('\0'.join([model, normalize_prompt(prompt), fingerprint]).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry['created'] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['text']
+
+    def put(self, key: str, text: str):
+        with self._lock:
+            self._entries[key] = {'text': text, 'created': time.time()}
+            self._entries.move_to_end(key)
+            now = time.time()
+            for old_key in [k for k, e in self._entries.items() if now - e['created'] > self.ttl]:
+                del self._entries[old_key]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def _save(self):
+        # written in LRU order, so the recency survives a restart
+        tmp = self.path + '.tmp'
+        with open(tmp, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._entries),
+            }
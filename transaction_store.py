@@ -0,0 +1,241 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import perf
+from compact import month_key
+
+'''
+Session transaction history that grows without copying itself on every insert.
+Columns live in preallocated numpy buffers that double in size when full, so an
+append is amortized O(1). The DataFrame the app reads is a zero-copy view over
+those buffers, built once per version and reused until the next append.
+Categorical columns keep their integer codes in the buffer, and a MonthKey column
+is filled in from Date for new rows.
+'''
+
+# derived results (rollups, filtered views, figures) kept per version
+DERIVED_ENTRIES = 64
+
+class _ColumnBuffer:
+    def __init__(self, values: np.ndarray, capacity: int):
+        self.data = np.empty(capacity, dtype=values.dtype)
+        self.data[:len(values)] = values
+
+    @classmethod
+    def missing(cls, length: int, capacity: int):
+        return cls(np.full(length, None, dtype=object), capacity)
+
+    def grow(self, capacity: int):
+        data = np.empty(capacity, dtype=self.data.dtype)
+        data[:len(self.data)] = self.data
+        self.data = data
+
+    def set(self, i: int, value):
+        kind = self.data.dtype.kind
+        if _is_missing(value):
+            self.fill_missing(i, i + 1)
+            return
+        if kind == 'M':
+            value = pd.Timestamp(value).to_datetime64()
+        try:
+            self.data[i] = value
+        except (TypeError, ValueError):
+            self._widen(object)
+            self.data[i] = value
+
+    def fill_missing(self, start: int, end: int):
+        kind = self.data.dtype.kind
+        if kind in 'iub':
+            self._widen(np.float64 if kind in 'iu' else object)
+            kind = self.data.dtype.kind
+        self.data[start:end] = {'f': np.nan, 'M': np.datetime64('NaT'), 'm': np.timedelta64('NaT')}.get(kind, None)
+
+    def set_many(self, start: int, values: np.ndarray):
+        end = start + len(values)
+        if values.dtype != self.data.dtype:
+            if np.can_cast(values.dtype, self.data.dtype, casting='same_kind'):
+                values = values.astype(self.data.dtype)
+            else:
+                self._widen(np.result_type(values.dtype, self.data.dtype))
+        self.data[start:end] = values
+
+    def _widen(self, dtype):
+        data = self.data.astype(dtype)
+        if data.dtype.kind == 'O' and self.data.dtype.kind == 'f':
+            data[np.isnan(self.data)] = None
+        self.data = data
+
+    def view(self, length: int) -> pd.Series:
+        return pd.Series(self.data[:length], dtype=self.data.dtype, copy=False)
+
+
+class _CategoryBuffer:
+    """Integer codes into a list of categories that grows as new values arrive; -1 is missing."""
+
+    def __init__(self, values: pd.Categorical, capacity: int):
+        self.categories = list(values.categories)
+        self._lookup = {c: i for i, c in enumerate(self.categories)}
+        self.data = np.empty(capacity, dtype=self._code_dtype())
+        self.data[:len(values)] = values.codes
+
+    def _code_dtype(self):
+        for dtype in (np.int8, np.int16):
+            if len(self.categories) < np.iinfo(dtype).max:
+                return dtype
+        return np.int32
+
+    def grow(self, capacity: int):
+        data = np.empty(capacity, dtype=self.data.dtype)
+        data[:len(self.data)] = self.data
+        self.data = data
+
+    def _add_categories(self, values):
+        for value in values:
+            if value not in self._lookup:
+                self._lookup[value] = len(self.categories)
+                self.categories.append(value)
+        if self.data.dtype != self._code_dtype():
+            self.data = self.data.astype(self._code_dtype())
+
+    def set(self, i: int, value):
+        if _is_missing(value):
+            self.data[i] = -1
+            return
+        self._add_categories([value])
+        self.data[i] = self._lookup[value]
+
+    def set_many(self, start: int, values):
+        # factorize the new values, then translate their codes into this buffer's codes
+        codes, uniques = pd.factorize(values)
+        uniques = list(uniques)
+        self._add_categories(uniques)
+        mapping = np.array([self._lookup[u] for u in uniques] + [-1], dtype=self.data.dtype)
+        self.data[start:start + len(codes)] = mapping[codes]
+
+    def fill_missing(self, start: int, end: int):
+        self.data[start:end] = -1
+
+    def view(self, length: int) -> pd.Series:
+        return pd.Series(pd.Categorical.from_codes(self.data[:length], categories=self.categories, validate=False), copy=False)
+
+
+def _is_missing(value) -> bool:
+    if value is None:
+        return True
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
+
+
+def _buffer(values: pd.Series, capacity: int):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return _CategoryBuffer(values.array, capacity)
+    return _ColumnBuffer(values.to_numpy(), capacity)
+
+
+class TransactionStore:
+    """
+    Append-optimized holder for the transaction history.
+
+    append() and extend() write into the column buffers and bump version; df builds
+    the consolidated DataFrame lazily on first read after a change. Anything derived
+    from the data can key its cache on version.
+    """
+
+    def __init__(self, df: pd.DataFrame = None, min_capacity: int = 1024):
+        df = df if df is not None else pd.DataFrame()
+        self._length = len(df)
+        self._capacity = max(min_capacity, 2 * self._length)
+        self._columns = {col: _buffer(df[col], self._capacity) for col in df.columns}
+        self.version = 0
+        self._view = None
+        self._view_version = -1
+        self._derived = OrderedDict()
+        self._derived_version = -1
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def _reserve(self, extra: int):
+        needed = self._length + extra
+        if needed <= self._capacity:
+            return
+        while self._capacity < needed:
+            self._capacity *= 2
+        for column in self._columns.values():
+            column.grow(self._capacity)
+
+    def _column(self, col, dtype=None):
+        if col not in self._columns:
+            if self._length == 0 and dtype is not None:
+                # nothing to back-fill yet, so take the incoming type instead of object
+                self._columns[col] = _ColumnBuffer(np.empty(0, dtype=dtype), self._capacity)
+            else:
+                self._columns[col] = _ColumnBuffer.missing(self._length, self._capacity)
+        return self._columns[col]
+
+    def append(self, row: dict):
+        """Add one transaction. Missing columns are left empty, new ones are added."""
+        if 'MonthKey' in self._columns and 'MonthKey' not in row and 'Date' in row:
+            row = {**row, 'MonthKey': month_key([row['Date']])[0]}
+        self._reserve(1)
+        for col in row:
+            self._column(col)
+        for col, column in self._columns.items():
+            column.set(self._length, row.get(col))
+        self._length += 1
+        self.version += 1
+
+    def extend(self, rows: pd.DataFrame):
+        """Add many transactions in one step."""
+        if rows.empty:
+            return
+        if 'MonthKey' in self._columns and 'MonthKey' not in rows.columns and 'Date' in rows.columns:
+            rows = rows.assign(MonthKey=month_key(rows['Date']))
+        self._reserve(len(rows))
+        for col in rows.columns:
+            self._column(col, rows[col].to_numpy().dtype)
+        for col, column in self._columns.items():
+            if col not in rows.columns:
+                column.fill_missing(self._length, self._length + len(rows))
+            else:
+                values = rows[col]
+                column.set_many(self._length, values.array if isinstance(column, _CategoryBuffer) else values.to_numpy())
+        self._length += len(rows)
+        self.version += 1
+
+    @property
+    @perf.timed('TransactionStore.df')
+    def df(self) -> pd.DataFrame:
+        if self._view_version != self.version:
+            self._view = pd.DataFrame(
+                {col: column.view(self._length) for col, column in self._columns.items()},
+                copy=False
+            )
+            self._view_version = self.version
+        return self._view
+
+    def cached(self, name, builder):
+        """
+        builder(df) computed once per version and shared by every caller that asks for name.
+        name can be any hashable, e.g. a tuple with the widget values the result depends on.
+        Only the DERIVED_ENTRIES most recently used results are kept.
+        """
+        if self._derived_version != self.version:
+            self._derived = OrderedDict()
+            self._derived_version = self.version
+        if name in self._derived:
+            self._derived.move_to_end(name)
+            perf.count('store.cache_hits')
+            return self._derived[name]
+        perf.count('store.cache_misses')
+        value = builder(self.df)
+        self._derived[name] = value
+        while len(self._derived) > DERIVED_ENTRIES:
+            self._derived.popitem(last=False)
+        return value